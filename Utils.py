@@ -1,3 +1,7 @@
+import contextlib
+import functools
+import inspect
+
 import smartpy as sp
 
 class Math:
@@ -130,6 +134,87 @@ class Bytes:
         # - Data identifier: (int = 0x00) (1 byte)
         return sp.slice(b, 2, sp.as_nat(sp.len(b) - 2)).open_some("Could not encode nat to bytes.")
 
+    @staticmethod
+    def of_nat_ascii(number):
+        """
+            Encode a nat as the ASCII bytes of its decimal representation
+            (e.g. 42 => 0x3432), without going through a string.
+
+            Each digit is turned into its ASCII code (48 + digit) and placed
+            in its own byte of an accumulator nat, which BYTES converts in
+            one go (big-endian).
+        """
+        return sp.michelson(
+            """
+            PUSH nat 1;
+            PUSH nat 0;
+            DIG 2;
+            DUP;
+            PUSH nat 0;
+            COMPARE;
+            NEQ;
+            IF
+            {
+                PUSH bool True;
+                LOOP
+                {
+                    PUSH nat 10;
+                    SWAP;
+                    EDIV;
+                    IF_NONE
+                    {
+                        UNIT;
+                        FAILWITH;
+                    }
+                    {};
+                    UNPAIR;
+                    SWAP;
+                    PUSH nat 48;
+                    ADD;
+                    DUP 4;
+                    MUL;
+                    DIG 2;
+                    ADD;
+                    DIG 2;
+                    PUSH nat 256;
+                    MUL;
+                    DIG 2;
+                    DIP { SWAP; };
+                    DUP;
+                    PUSH nat 0;
+                    COMPARE;
+                    NEQ;
+                };
+                DROP;
+                DIP { DROP; };
+            }
+            {
+                DROP 3;
+                PUSH nat 48;
+            };
+            BYTES;
+            """,
+            [sp.TNat],
+            [sp.TBytes]
+        )(number)
+
+        """
+            The inlined michelson above is an optimized version of the code below.
+        """
+        """
+        x = sp.local(generate_var('x'), number)
+        result = sp.local(generate_var('result'), 48)
+        with sp.if_(x.value != 0):
+            result.value = 0
+            weight = sp.local(generate_var('weight'), 1)
+            with sp.while_(x.value != 0):
+                result.value += (48 + x.value % 10) * weight.value
+                weight.value *= 256
+                x.value //= 10
+
+        return BYTES(result.value)
+        """
+
 class String:
     @staticmethod
     def ends_with(text, postfix):
@@ -335,6 +420,60 @@ class Address:
 """
 
 latest_var_id = 0
+var_scope_depth = 0
+
+@contextlib.contextmanager
+def var_scope():
+    """
+        Number the variables generated in the block from 0
+
+        Nested scopes continue the numbering of the outermost one, so the
+        names stay unique within it. The numbering outside is restored on
+        exit.
+    """
+    global latest_var_id, var_scope_depth
+
+    outer_var_id = latest_var_id
+    if var_scope_depth == 0:
+        latest_var_id = 0
+    var_scope_depth += 1
+    try:
+        yield
+    finally:
+        var_scope_depth -= 1
+        if var_scope_depth == 0:
+            latest_var_id = outer_var_id
+
+def scoped(f):
+    """
+        Wrap `f` in a `var_scope`, keeping its signature for SmartPy
+    """
+    @functools.wraps(f)
+    def wrapper(*args, **kwargs):
+        with var_scope():
+            return f(*args, **kwargs)
+    wrapper.__signature__ = inspect.signature(f)
+    return wrapper
+
+def entry_point(f=None, **kwargs):
+    """
+        `sp.entry_point` whose generated variables are numbered from 0
+
+        Use it for the entry points calling the utilities: their code then
+        doesn't depend on what was compiled before them.
+    """
+    if f is None:
+        return lambda f: entry_point(f, **kwargs)
+    return sp.entry_point(scoped(f), **kwargs)
+
+def offchain_view(f=None, **kwargs):
+    """
+        `sp.offchain_view` whose generated variables are numbered from 0
+    """
+    if f is None:
+        return lambda f: offchain_view(f, **kwargs)
+    return sp.offchain_view(**kwargs)(scoped(f))
+
 def generate_var(postfix = None):
     """
         Generate a variable name
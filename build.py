@@ -0,0 +1,99 @@
+"""
+Compile or test SmartPy scripts, skipping the ones whose inputs didn't
+change since their last build.
+
+    python3 build.py compile result.py [--output compilation]
+    python3 build.py test fa2.py result.py [--output output]
+
+A build is cached in `.build_cache/` under the hash of the mode, the
+normalised sources of the script and of its dependencies and the SmartPy
+version. Comments and formatting don't change the hash. The dependencies
+are the `file:` imports of the script, followed recursively.
+"""
+
+import argparse
+import ast
+import hashlib
+import os
+import shutil
+import subprocess
+import tempfile
+
+CACHE_DIR = os.environ.get("SMARTPY_BUILD_CACHE", ".build_cache")
+SMARTPY = os.path.expanduser("~/smartpy-cli/SmartPy.sh")
+
+
+def normalised_source(path):
+    """AST dump of `path`: the same for sources differing only by comments
+    or formatting."""
+    with open(path) as f:
+        return ast.dump(ast.parse(f.read(), path))
+
+
+def dependencies(path):
+    """Local files imported by `path`, recursively, `path` included."""
+    found = []
+    pending = [path]
+    while pending:
+        current = pending.pop()
+        if current in found:
+            continue
+        found.append(current)
+        with open(current) as f:
+            tree = ast.parse(f.read(), current)
+        for node in ast.walk(tree):
+            if isinstance(node, ast.Constant) and isinstance(node.value, str):
+                if node.value.startswith("file:") and node.value != "file:":
+                    pending.append(node.value[len("file:"):])
+    return sorted(found)
+
+
+def smartpy_version(smartpy):
+    return subprocess.run(
+        [smartpy, "--version"], capture_output=True, text=True, check=True
+    ).stdout.strip()
+
+
+def build_key(mode, path, version):
+    digest = hashlib.sha256()
+    digest.update(("%s\n%s\n%s\n" % (mode, path, version)).encode())
+    for dependency in dependencies(path):
+        digest.update(dependency.encode())
+        digest.update(normalised_source(dependency).encode())
+    return digest.hexdigest()
+
+
+def build(mode, path, output, smartpy, version, force=False):
+    """Build `path` into `output`. Return whether the cache was used."""
+    cached = os.path.join(CACHE_DIR, build_key(mode, path, version))
+    hit = os.path.isdir(cached) and not force
+    if not hit:
+        with tempfile.TemporaryDirectory() as tmp:
+            subprocess.run([smartpy, mode, path, tmp], check=True)
+            if os.path.isdir(cached):
+                shutil.rmtree(cached)
+            shutil.copytree(tmp, cached)
+    shutil.copytree(cached, output, dirs_exist_ok=True)
+    return hit
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("mode", choices=["compile", "test"])
+    parser.add_argument("scripts", nargs="+")
+    parser.add_argument("--output", help="defaults to compilation or output")
+    parser.add_argument("--smartpy", default=SMARTPY)
+    parser.add_argument("--force", action="store_true",
+                        help="rebuild even if cached")
+    args = parser.parse_args()
+
+    output = args.output or {"compile": "compilation", "test": "output"}[args.mode]
+    version = smartpy_version(args.smartpy)
+    for script in args.scripts:
+        hit = build(args.mode, script, output, args.smartpy, version,
+                    args.force)
+        print("%s %s" % ("cached" if hit else "built ", script))
+
+
+if __name__ == "__main__":
+    main()
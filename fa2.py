@@ -5,6 +5,8 @@ Documentation: [FA2 lib](/docs/guides/FA/FA2_lib).
 Multiple mixins and several standard [policies](https://gitlab.com/tezos/tzip/-/blob/master/proposals/tzip-12/permissions-policy.md#operator-permission-behavior) are supported.
 """
 
+import inspect
+
 import smartpy as sp
 
 
@@ -23,6 +25,16 @@ t_update_operators_params = sp.TList(
     )
 )
 
+t_operator_for_all = sp.TRecord(owner=sp.TAddress, operator=sp.TAddress).layout(
+    ("owner", "operator")
+)
+
+t_update_operators_for_all_params = sp.TList(
+    sp.TVariant(
+        add_operator=t_operator_for_all, remove_operator=t_operator_for_all
+    )
+)
+
 t_transfer_batch = sp.TRecord(
     from_=sp.TAddress,
     txs=sp.TList(
@@ -36,6 +48,40 @@ t_transfer_batch = sp.TRecord(
 
 t_transfer_params = sp.TList(t_transfer_batch)
 
+t_permit_params = sp.TList(
+    sp.TRecord(
+        public_key=sp.TKey,
+        signature=sp.TSignature,
+        transfers_hash=sp.TBytes,
+    ).layout(("public_key", ("signature", "transfers_hash")))
+)
+
+t_transfer_with_permits_params = sp.TList(
+    sp.TRecord(
+        public_key=sp.TKey,
+        signature=sp.TOption(sp.TSignature),
+        transfers=t_transfer_params,
+    ).layout(("public_key", ("signature", "transfers")))
+)
+
+t_transfer_event = sp.TRecord(
+    from_=sp.TOption(sp.TAddress),
+    to_=sp.TOption(sp.TAddress),
+    token_id=sp.TNat,
+    amount=sp.TNat,
+).layout(("from_", ("to_", ("token_id", "amount"))))
+
+t_operator_update_event = sp.TRecord(
+    owner=sp.TAddress,
+    operator=sp.TAddress,
+    token_id=sp.TOption(sp.TNat),
+    is_operator=sp.TBool,
+).layout(("owner", ("operator", ("token_id", "is_operator"))))
+
+t_page_params = sp.TRecord(offset=sp.TNat, limit=sp.TNat).layout(
+    ("offset", "limit")
+)
+
 t_balance_of_request = sp.TRecord(owner=sp.TAddress, token_id=sp.TNat).layout(
     ("owner", "token_id")
 )
@@ -54,6 +100,32 @@ t_balance_of_params = sp.TRecord(
 # Policies #
 ############
 
+# A policy is any object with `init_policy`, `check_tx_transfer_permissions`,
+# `check_operator_update_permissions` and `is_operator`. The batch hook and
+# the `sender_is_owner` argument came later: the contracts go through the two
+# functions below so that policies written without them keep working.
+
+
+def check_batch_permissions(policy, contract):
+    """Run the `check_batch_permissions` hook of `policy`, if any."""
+    hook = getattr(policy, "check_batch_permissions", None)
+    if hook is not None:
+        hook(contract)
+
+
+def check_tx_transfer_permissions(
+    policy, contract, from_, to_, token_id, sender_is_owner=None
+):
+    """Run the per tx check of `policy`, passing `sender_is_owner` only if
+    the policy accepts it."""
+    check = policy.check_tx_transfer_permissions
+    if sender_is_owner is not None and (
+        "sender_is_owner" in inspect.signature(check).parameters
+    ):
+        check(contract, from_, to_, token_id, sender_is_owner)
+    else:
+        check(contract, from_, to_, token_id)
+
 
 class NoTransfer:
     """(Transfer Policy) No transfer allowed."""
@@ -63,7 +135,16 @@ class NoTransfer:
         self.supports_transfer = False
         self.supports_operator = False
 
-    def check_tx_transfer_permissions(self, contract, from_, to_, token_id):
+    def check_batch_permissions(self, contract):
+        """(Optional) Checks done once per `transfer` (or `burn`) call,
+        before the per tx checks."""
+        pass
+
+    def check_tx_transfer_permissions(
+        self, contract, from_, to_, token_id, sender_is_owner=None
+    ):
+        """Checks done for each tx. `sender_is_owner` (optional argument) is
+        the value of `sp.sender == from_` when the caller computed it."""
         pass
 
     def check_operator_update_permissions(self, contract, operator_permission):
@@ -82,8 +163,15 @@ class OwnerTransfer:
         self.supports_transfer = True
         self.supports_operator = False
 
-    def check_tx_transfer_permissions(self, contract, from_, to_, token_id):
-        sp.verify(sp.sender == from_, "FA2_NOT_OWNER")
+    def check_batch_permissions(self, contract):
+        pass
+
+    def check_tx_transfer_permissions(
+        self, contract, from_, to_, token_id, sender_is_owner=None
+    ):
+        if sender_is_owner is None:
+            sender_is_owner = sp.sender == from_
+        sp.verify(sender_is_owner, "FA2_NOT_OWNER")
 
     def check_operator_update_permissions(self, contract, operator_permission):
         pass
@@ -106,14 +194,23 @@ class OwnerOrOperatorTransfer:
             operators=sp.big_map(tkey=t_operator_permission, tvalue=sp.TUnit)
         )
 
-    def check_tx_transfer_permissions(self, contract, from_, to_, token_id):
-        sp.verify(
-            (sp.sender == from_)
-            | contract.data.operators.contains(
-                sp.record(owner=from_, operator=sp.sender, token_id=token_id)
-            ),
-            message="FA2_NOT_OPERATOR",
-        )
+    def check_batch_permissions(self, contract):
+        pass
+
+    def check_tx_transfer_permissions(
+        self, contract, from_, to_, token_id, sender_is_owner=None
+    ):
+        if sender_is_owner is None:
+            sender_is_owner = sp.sender == from_
+        # The operator big_map is only read when the sender is not the owner.
+        with sp.if_(~sender_is_owner):
+            sp.verify(
+                contract.data.operators.contains(
+                    sp.record(owner=from_, operator=sp.sender,
+                              token_id=token_id)
+                ),
+                message="FA2_NOT_OPERATOR",
+            )
 
     def check_operator_update_permissions(self, contract, operator_permission):
         sp.verify(operator_permission.owner == sp.sender, "FA2_NOT_OWNER")
@@ -122,11 +219,81 @@ class OwnerOrOperatorTransfer:
         return contract.data.operators.contains(operator_permission)
 
 
+class OwnerOrOperatorForAllTransfer(OwnerOrOperatorTransfer):
+    """(Transfer Policy) Only owner and operators can transfer tokens.
+
+    On top of the per token operators of `OwnerOrOperatorTransfer`, an
+    owner can approve an operator for all its tokens with a single entry
+    in the `operators_for_all` big_map, keyed by `(owner, operator)`. Adds
+    an `update_operators_for_all` entrypoint.
+    """
+
+    def init_policy(self, contract):
+        OwnerOrOperatorTransfer.init_policy(self, contract)
+        contract.update_initial_storage(
+            operators_for_all=sp.big_map(
+                tkey=t_operator_for_all, tvalue=sp.TUnit)
+        )
+
+        # Add an update_operators_for_all entrypoint
+        def update_operators_for_all(self, batch):
+            sp.set_type(batch, t_update_operators_for_all_params)
+            with sp.for_("action", batch) as action:
+                with action.match_cases() as arg:
+                    with arg.match("add_operator") as operator:
+                        self.policy.check_operator_update_permissions(
+                            self, operator)
+                        self.data.operators_for_all[operator] = sp.unit
+                        self.operator_update_event_(
+                            "update_operators_for_all", operator, None, True)
+                    with arg.match("remove_operator") as operator:
+                        self.policy.check_operator_update_permissions(
+                            self, operator)
+                        del self.data.operators_for_all[operator]
+                        self.operator_update_event_(
+                            "update_operators_for_all", operator, None, False)
+
+        contract.update_operators_for_all = sp.entry_point(
+            update_operators_for_all)
+
+    def check_tx_transfer_permissions(
+        self, contract, from_, to_, token_id, sender_is_owner=None
+    ):
+        if sender_is_owner is None:
+            sender_is_owner = sp.sender == from_
+        with sp.if_(~sender_is_owner):
+            with sp.if_(
+                ~contract.data.operators_for_all.contains(
+                    sp.record(owner=from_, operator=sp.sender)
+                )
+            ):
+                sp.verify(
+                    contract.data.operators.contains(
+                        sp.record(owner=from_, operator=sp.sender,
+                                  token_id=token_id)
+                    ),
+                    message="FA2_NOT_OPERATOR",
+                )
+
+    def is_operator(self, contract, operator_permission):
+        return contract.data.operators.contains(
+            operator_permission
+        ) | contract.data.operators_for_all.contains(
+            sp.record(
+                owner=operator_permission.owner,
+                operator=operator_permission.operator,
+            )
+        )
+
+
 class PauseTransfer:
     """(Transfer Policy) Decorate any policy to add a pause mechanism.
 
     Adds a `set_pause` entrypoint. Checks that contract.data.paused is
-    `False` before accepting transfers and operator updates.
+    `False` before accepting transfers and operator updates. The transfer
+    check is done once per call by `check_batch_permissions`, before any tx
+    is looked at: a paused contract fails with `FA2_PAUSED` even for an
+    empty batch or an undefined token, instead of `FA2_TOKEN_UNDEFINED`.
 
     Needs the `Admin` mixin in order to work.
     """
@@ -151,11 +318,16 @@ class PauseTransfer:
 
         contract.set_pause = sp.entry_point(set_pause)
 
-    def check_tx_transfer_permissions(self, contract, from_, to_, token_id):
+    def check_batch_permissions(self, contract):
         sp.verify(~contract.data.paused, message=sp.pair(
             "FA2_TX_DENIED", "FA2_PAUSED"))
-        self.policy.check_tx_transfer_permissions(
-            contract, from_, to_, token_id)
+        check_batch_permissions(self.policy, contract)
+
+    def check_tx_transfer_permissions(
+        self, contract, from_, to_, token_id, sender_is_owner=None
+    ):
+        check_tx_transfer_permissions(
+            self.policy, contract, from_, to_, token_id, sender_is_owner)
 
     def check_operator_update_permissions(self, contract, operator_param):
         sp.verify(
@@ -173,9 +345,57 @@ class PauseTransfer:
 ##########
 
 
+# Contract class => names of its offchain view attributes.
+_offchain_view_names = {}
+
+
 class Common(sp.Contract):
     """Common logic between Fa2Nft, Fa2Fungible and Fa2SingleAsset."""
 
+    # Access frequency of the storage fields, e.g. `{"ledger": 2,
+    # "operators": 1}`. When set, the storage is laid out as a right comb
+    # sorted by decreasing frequency so that the hot fields are the
+    # shallowest. Undeclared fields count as 0. `None` keeps the default
+    # SmartPy layout.
+    storage_access_frequency = None
+
+    # Names of the entrypoints that emit events, e.g. `("transfer",
+    # "mint")`. Events let indexers follow the contract from the operation
+    # receipts but cost gas, so they are enabled per entrypoint. `"mint"`
+    # covers every mint entrypoint (`mint`, `mint_from_template`,
+    # `airdrop`) and `"burn"` every burn one.
+    emit_events = ()
+
+    def init(self, **kargs):
+        sp.Contract.init(self, **kargs)
+        self.storage_fields = dict.fromkeys(kargs)
+        self.init_storage_layout_()
+
+    def update_initial_storage(self, **kargs):
+        sp.Contract.update_initial_storage(self, **kargs)
+        self.storage_fields.update(dict.fromkeys(kargs))
+        self.init_storage_layout_()
+
+    def storage_layout_(self):
+        """Right comb layout of the storage fields, hot fields first."""
+        fields = sorted(
+            self.storage_fields,
+            key=lambda field: -self.storage_access_frequency.get(field, 0),
+        )
+        layout = fields[-1]
+        for field in reversed(fields[:-1]):
+            layout = (field, layout)
+        return layout
+
+    def init_storage_layout_(self):
+        if self.storage_access_frequency is None:
+            return
+        self.init_type(
+            sp.TRecord(
+                **{field: sp.TUnknown() for field in self.storage_fields}
+            ).layout(self.storage_layout_())
+        )
+
     def __init__(self, policy=None, metadata_base=None, token_metadata={}):
         if policy is None:
             self.policy = OwnerOrOperatorTransfer()
@@ -196,6 +416,31 @@ class Common(sp.Contract):
     def is_defined(self, token_id):
         return self.data.token_metadata.contains(token_id)
 
+    def offchain_views_(self):
+        """Return the offchain views of the contract sorted by name.
+
+        The names of the view attributes are looked up once per class in the
+        `__dict__` of its MRO. Views set on the instance are added.
+        """
+        cls = type(self)
+        if cls not in _offchain_view_names:
+            attributes = {}
+            for klass in reversed(cls.__mro__):
+                attributes.update(vars(klass))
+            _offchain_view_names[cls] = [
+                name
+                for name, attr in attributes.items()
+                if isinstance(attr, sp.OnOffchainView) and attr.kind == "offchain"
+            ]
+        views = {name: getattr(self, name) for name in _offchain_view_names[cls]}
+        for name, attr in vars(self).items():
+            if isinstance(attr, sp.OnOffchainView):
+                if attr.kind == "offchain":
+                    views[name] = attr
+                else:
+                    views.pop(name, None)
+        return [views[name] for name in sorted(views)]
+
     def generate_contract_metadata(self, filename, metadata_base=None):
         """Generate a metadata json file with all the contract's offchain views
         and standard TZIP-126 and TZIP-016 key/values."""
@@ -213,13 +458,7 @@ class Common(sp.Contract):
                 },
                 "permissions": {"receiver": "owner-no-hook", "sender": "owner-no-hook"},
             }
-        offchain_views = []
-        for f in dir(self):
-            attr = getattr(self, f)
-            if isinstance(attr, sp.OnOffchainView):
-                if attr.kind == "offchain":
-                    offchain_views.append(attr)
-        metadata_base["views"] = offchain_views
+        metadata_base["views"] = self.offchain_views_()
         metadata_base["permissions"]["operator"] = self.policy.name
         self.init_metadata(filename, metadata_base)
 
@@ -237,6 +476,59 @@ class Common(sp.Contract):
 
         return requests.map(f_process_request)
 
+    def checked_transfer_tx_(self, from_, tx, sender_is_owner=None):
+        """Check and perform a single transfer tx.
+
+        The ordering of sp.verify is important: 1) token_undefined, 2)
+        transfer permission 3) balance.
+        """
+        sp.verify(self.is_defined(tx.token_id), "FA2_TOKEN_UNDEFINED")
+        check_tx_transfer_permissions(
+            self.policy, self, from_, tx.to_, tx.token_id, sender_is_owner)
+        with sp.if_(tx.amount > 0):
+            self.transfer_tx_(from_, tx)
+
+    # Events
+
+    def transfer_event_(self, entrypoint, from_, to_, token_id, amount):
+        """Emit a `transfer_event` if `entrypoint` is in `emit_events`.
+
+        `from_` is None for mints and `to_` is None for burns.
+        """
+        if entrypoint in self.emit_events:
+            sp.emit(
+                sp.set_type_expr(
+                    sp.record(
+                        from_=sp.none if from_ is None else sp.some(from_),
+                        to_=sp.none if to_ is None else sp.some(to_),
+                        token_id=token_id,
+                        amount=amount,
+                    ),
+                    t_transfer_event,
+                ),
+                tag="transfer_event",
+            )
+
+    def operator_update_event_(self, entrypoint, operator, token_id, is_operator):
+        """Emit an `operator_update_event` if `entrypoint` is in
+        `emit_events`.
+
+        `token_id` is None for the operators of all the tokens.
+        """
+        if entrypoint in self.emit_events:
+            sp.emit(
+                sp.set_type_expr(
+                    sp.record(
+                        owner=operator.owner,
+                        operator=operator.operator,
+                        token_id=sp.none if token_id is None else sp.some(token_id),
+                        is_operator=is_operator,
+                    ),
+                    t_operator_update_event,
+                ),
+                tag="operator_update_event",
+            )
+
     # Entry points
 
     @sp.entry_point
@@ -251,10 +543,16 @@ class Common(sp.Contract):
                         self.policy.check_operator_update_permissions(
                             self, operator)
                         self.data.operators[operator] = sp.unit
+                        self.operator_update_event_(
+                            "update_operators", operator, operator.token_id,
+                            True)
                     with arg.match("remove_operator") as operator:
                         self.policy.check_operator_update_permissions(
                             self, operator)
                         del self.data.operators[operator]
+                        self.operator_update_event_(
+                            "update_operators", operator, operator.token_id,
+                            False)
         else:
             sp.failwith("FA2_OPERATORS_UNSUPPORTED")
 
@@ -276,20 +574,23 @@ class Common(sp.Contract):
         """Accept a list of transfer operations between a source and multiple
         destinations.
 
-        `transfer_tx_` must be defined in the child class.
+        `transfer_tx_` must be defined in the child class unless it
+        overrides `checked_transfer_tx_`.
         """
         sp.set_type(batch, t_transfer_params)
         if self.policy.supports_transfer:
+            check_batch_permissions(self.policy, self)
             with sp.for_("transfer", batch) as transfer:
+                sender_is_owner = sp.compute(sp.sender == transfer.from_)
                 with sp.for_("tx", transfer.txs) as tx:
-                    # The ordering of sp.verify is important: 1) token_undefined, 2) transfer permission 3) balance
-                    sp.verify(self.is_defined(tx.token_id),
-                              "FA2_TOKEN_UNDEFINED")
-                    self.policy.check_tx_transfer_permissions(
-                        self, transfer.from_, tx.to_, tx.token_id
-                    )
-                    with sp.if_(tx.amount > 0):
-                        self.transfer_tx_(transfer.from_, tx)
+                    self.checked_transfer_tx_(
+                        transfer.from_, tx, sender_is_owner)
+                    # Transfers of 0 tokens don't change anything.
+                    if "transfer" in self.emit_events:
+                        with sp.if_(tx.amount > 0):
+                            self.transfer_event_(
+                                "transfer", transfer.from_, tx.to_,
+                                tx.token_id, tx.amount)
         else:
             sp.failwith("FA2_TX_DENIED")
 
@@ -300,6 +601,24 @@ class Common(sp.Contract):
         """OffchainView: Return the list of all the token IDs known to the contract."""
         sp.result(sp.range(0, self.data.last_token_id))
 
+    @sp.offchain_view(pure=True)
+    def all_tokens_page(self, params):
+        """OffchainView: Return the token IDs in `[offset, offset + limit)`
+        known to the contract."""
+        sp.set_type(params, t_page_params)
+        sp.result(
+            sp.range(
+                params.offset,
+                sp.min(params.offset + params.limit, self.data.last_token_id),
+            )
+        )
+
+    @sp.offchain_view(pure=True)
+    def live_token_count(self):
+        """OffchainView: Return the number of token IDs known to the
+        contract."""
+        sp.result(self.data.last_token_id)
+
     @sp.offchain_view(pure=True)
     def is_operator(self, params):
         """Return whether `operator` is allowed to transfer `token_id` tokens
@@ -342,6 +661,8 @@ class Fa2Nft(Common):
         self, metadata, token_metadata=[], ledger={}, policy=None, metadata_base=None
     ):
         ledger, token_metadata = self.initial_mint(token_metadata, ledger)
+        # Kept for the mixins indexing the initial ledger.
+        self.initial_ledger = ledger
         self.init(
             ledger=sp.big_map(ledger, tkey=sp.TNat, tvalue=sp.TAddress),
             metadata=sp.set_type_expr(
@@ -372,21 +693,321 @@ class Fa2Nft(Common):
                 )
         return (ledger, token_metadata_dict)
 
+    def owner_opt_(self, token_id):
+        """Return the owner of `token_id`, `sp.none` if it has none."""
+        return self.data.ledger.get_opt(token_id)
+
+    def move_token_(self, token_id, from_, to_):
+        """Give `token_id`, owned by `from_`, to `to_`."""
+        self.data.ledger[token_id] = to_
+        self.owner_changed_(token_id, from_, to_)
+
+    def owner_changed_(self, token_id, from_, to_):
+        """Meta-programming hook called whenever `token_id` changes owner.
+
+        `from_` is `None` on mint and `to_` is `None` on burn.
+        """
+        pass
+
     def balance_(self, owner, token_id):
         sp.verify(self.is_defined(token_id), "FA2_TOKEN_UNDEFINED")
-        return sp.eif(self.data.ledger[token_id] == owner, 1, 0)
+        return sp.eif(self.owner_opt_(token_id) == sp.some(owner), 1, 0)
 
     def supply_(self, token_id):
         sp.verify(self.is_defined(token_id), "FA2_TOKEN_UNDEFINED")
         return sp.nat(1)
 
+    def balance_of_batch(self, requests):
+        """Mapping of balances.
+
+        The owner of each distinct token_id is read once and kept in a
+        local map for the other requests on the same token.
+        """
+        sp.set_type(requests, sp.TList(t_balance_of_request))
+        owners = sp.local(
+            "owners", sp.map(tkey=sp.TNat, tvalue=sp.TOption(sp.TAddress)))
+        responses = sp.local("responses", sp.list(t=t_balance_of_response))
+        with sp.for_("req", requests) as req:
+            with sp.if_(~owners.value.contains(req.token_id)):
+                owner = sp.compute(self.owner_opt_(req.token_id))
+                with sp.if_(owner.is_none()):
+                    sp.verify(self.is_defined(req.token_id),
+                              "FA2_TOKEN_UNDEFINED")
+                owners.value[req.token_id] = owner
+            responses.value.push(
+                sp.record(
+                    request=req,
+                    balance=sp.eif(
+                        owners.value[req.token_id] == sp.some(req.owner), 1, 0
+                    ),
+                )
+            )
+        return responses.value.rev()
+
     def transfer_tx_(self, from_, tx):
         sp.verify(
-            (tx.amount == 1) & (self.data.ledger[tx.token_id] == from_),
+            (tx.amount == 1) & (self.owner_opt_(tx.token_id) == sp.some(from_)),
             message="FA2_INSUFFICIENT_BALANCE",
         )
         # Do the transfer
-        self.data.ledger[tx.token_id] = tx.to_
+        self.move_token_(tx.token_id, from_, tx.to_)
+
+    def checked_transfer_tx_(self, from_, tx, sender_is_owner=None):
+        """Single `ledger` lookup version of `Common.checked_transfer_tx_`.
+
+        The owner read from `ledger` is used both to know that the token
+        exists and to check the balance. `token_metadata` is only read when
+        the token has no owner, to keep the errors of `Common`.
+        """
+        owner = sp.compute(self.owner_opt_(tx.token_id))
+        with sp.if_(owner.is_none()):
+            sp.verify(self.is_defined(tx.token_id), "FA2_TOKEN_UNDEFINED")
+        check_tx_transfer_permissions(
+            self.policy, self, from_, tx.to_, tx.token_id, sender_is_owner)
+        with sp.if_(tx.amount > 0):
+            sp.verify(
+                (tx.amount == 1) & (owner == sp.some(from_)),
+                message="FA2_INSUFFICIENT_BALANCE",
+            )
+            # Do the transfer
+            self.move_token_(tx.token_id, from_, tx.to_)
+
+
+class Fa2NftRange(Fa2Nft):
+    """Base class for a FA2 NFT contract minting ranges of tokens.
+
+    Respects the FA2 standard. A range of ids minted to the same owner is
+    stored as one `ledger` entry on its first id (plus one entry every
+    `range_checkpoint` ids): an id without entry belongs to the owner of
+    the closest lower id that has one. Transferring an id splits its range
+    by adding an entry on the next id.
+
+    Resolving an owner reads at most `range_checkpoint` entries, which keeps
+    transfers within the operation gas limit whatever the size of a range.
+    Tokens minted in a range share the metadata stored on the first id of
+    the range, see the `token_metadata` offchain view.
+
+    Tokens can't be burnt: `BurnNft` isn't compatible with this class.
+    """
+
+    range_checkpoint = 64
+
+    def initial_mint(self, token_metadata=[], ledger={}):
+        """Perform a mint before the origination.
+
+        Returns `ledger` and `token_metadata`.
+        """
+        ledger, token_metadata_dict = Fa2Nft.initial_mint(
+            self, token_metadata, ledger)
+        for token_id in token_metadata_dict:
+            if token_id not in ledger:
+                raise Exception("Every token_id must be in the ledger")
+        return (ledger, token_metadata_dict)
+
+    def is_defined(self, token_id):
+        return token_id < self.data.last_token_id
+
+    def owner_opt_(self, token_id):
+        """Return the owner of `token_id`, `sp.none` if it isn't defined.
+
+        Walks down the ids until one has a `ledger` entry.
+        """
+        owner = sp.local("range_owner", self.data.ledger.get_opt(token_id))
+        with sp.if_(owner.value.is_none() & self.is_defined(token_id)):
+            start = sp.local("range_start", token_id)
+            with sp.while_(owner.value.is_none()):
+                start.value = sp.as_nat(start.value - 1)
+                owner.value = self.data.ledger.get_opt(start.value)
+        return owner.value
+
+    def move_token_(self, token_id, from_, to_):
+        """Give `token_id`, owned by `from_`, to `to_`.
+
+        The next id keeps `from_` as owner.
+        """
+        next_id = sp.compute(token_id + 1)
+        with sp.if_(
+            self.is_defined(next_id) & ~self.data.ledger.contains(next_id)
+        ):
+            self.data.ledger[next_id] = from_
+        self.data.ledger[token_id] = to_
+        self.owner_changed_(token_id, from_, to_)
+
+    @sp.offchain_view(pure=True)
+    def token_metadata(self, token_id):
+        """Returns the token-metadata URI for the given token."""
+        sp.set_type(token_id, sp.TNat)
+        sp.verify(self.is_defined(token_id), "FA2_TOKEN_UNDEFINED")
+        start = sp.local("range_start", token_id)
+        with sp.while_(~self.data.token_metadata.contains(start.value)):
+            start.value = sp.as_nat(start.value - 1)
+        sp.result(
+            sp.record(
+                token_id=token_id,
+                token_info=self.data.token_metadata[start.value].token_info,
+            )
+        )
+
+
+class Fa2Fungible(Common):
+    """Base class for a FA2 fungible contract.
+
+    Respects the FA2 standard. Balances that drop to zero are removed from
+    the `ledger`.
+    """
+
+    ledger_type = "Fungible"
+
+    def __init__(
+        self, metadata, token_metadata=[], ledger={}, policy=None, metadata_base=None
+    ):
+        ledger, supply, token_metadata = self.initial_mint(
+            token_metadata, ledger)
+        self.init(
+            ledger=sp.big_map(
+                ledger, tkey=sp.TPair(sp.TAddress, sp.TNat), tvalue=sp.TNat
+            ),
+            metadata=sp.set_type_expr(
+                metadata, sp.TBigMap(sp.TString, sp.TBytes)),
+            last_token_id=sp.nat(len(token_metadata)),
+            supply=sp.big_map(supply, tkey=sp.TNat, tvalue=sp.TNat),
+        )
+        Common.__init__(
+            self,
+            policy=policy,
+            metadata_base=metadata_base,
+            token_metadata=token_metadata,
+        )
+
+    def initial_mint(self, token_metadata=[], ledger={}):
+        """Perform a mint before the origination.
+
+        Returns `ledger`, `supply` and `token_metadata`.
+        """
+        token_metadata_dict = {}
+        supply = {}
+        for token_id, metadata in enumerate(token_metadata):
+            token_metadata_dict[token_id] = sp.record(
+                token_id=token_id, token_info=metadata
+            )
+        for (address, token_id), amount in ledger.items():
+            if token_id not in token_metadata_dict:
+                raise Exception(
+                    "Ledger contains token_id with no corresponding metadata"
+                )
+            supply[token_id] = supply.get(token_id, 0) + amount
+        ledger = {key: amount for key, amount in ledger.items() if amount > 0}
+        supply = {key: amount for key, amount in supply.items() if amount > 0}
+        return (ledger, supply, token_metadata_dict)
+
+    def set_balance_(self, key, balance):
+        """Write `ledger[key]`, removing the entry when `balance` is 0."""
+        with sp.if_(balance == 0):
+            del self.data.ledger[key]
+        with sp.else_():
+            self.data.ledger[key] = balance
+
+    def balance_(self, owner, token_id):
+        sp.verify(self.is_defined(token_id), "FA2_TOKEN_UNDEFINED")
+        return self.data.ledger.get((owner, token_id), sp.nat(0))
+
+    def supply_(self, token_id):
+        sp.verify(self.is_defined(token_id), "FA2_TOKEN_UNDEFINED")
+        return self.data.supply.get(token_id, sp.nat(0))
+
+    def transfer_tx_(self, from_, tx):
+        from_ = sp.compute((from_, tx.token_id))
+        self.set_balance_(
+            from_,
+            sp.as_nat(
+                self.data.ledger.get(from_, sp.nat(0)) - tx.amount,
+                message="FA2_INSUFFICIENT_BALANCE",
+            ),
+        )
+        # Do the transfer
+        to_ = sp.compute((tx.to_, tx.token_id))
+        self.data.ledger[to_] = self.data.ledger.get(
+            to_, sp.nat(0)) + tx.amount
+
+
+class Fa2SingleAsset(Common):
+    """Base class for a FA2 single asset contract.
+
+    Respects the FA2 standard. The only token is `0`, the `ledger` is keyed
+    by address and balances that drop to zero are removed from it.
+    """
+
+    ledger_type = "SingleAsset"
+
+    def __init__(
+        self, metadata, token_metadata={}, ledger={}, policy=None, metadata_base=None
+    ):
+        self.init(
+            ledger=sp.big_map(
+                {address: amount for address, amount in ledger.items() if amount > 0},
+                tkey=sp.TAddress,
+                tvalue=sp.TNat,
+            ),
+            metadata=sp.set_type_expr(
+                metadata, sp.TBigMap(sp.TString, sp.TBytes)),
+            supply=sp.nat(sum(ledger.values())),
+        )
+        Common.__init__(
+            self,
+            policy=policy,
+            metadata_base=metadata_base,
+            token_metadata={
+                0: sp.record(token_id=0, token_info=token_metadata)},
+        )
+
+    def is_defined(self, token_id):
+        return token_id == 0
+
+    def set_balance_(self, key, balance):
+        """Write `ledger[key]`, removing the entry when `balance` is 0."""
+        with sp.if_(balance == 0):
+            del self.data.ledger[key]
+        with sp.else_():
+            self.data.ledger[key] = balance
+
+    def balance_(self, owner, token_id):
+        sp.verify(self.is_defined(token_id), "FA2_TOKEN_UNDEFINED")
+        return self.data.ledger.get(owner, sp.nat(0))
+
+    def supply_(self, token_id):
+        sp.verify(self.is_defined(token_id), "FA2_TOKEN_UNDEFINED")
+        return self.data.supply
+
+    def transfer_tx_(self, from_, tx):
+        self.set_balance_(
+            from_,
+            sp.as_nat(
+                self.data.ledger.get(from_, sp.nat(0)) - tx.amount,
+                message="FA2_INSUFFICIENT_BALANCE",
+            ),
+        )
+        # Do the transfer
+        self.data.ledger[tx.to_] = self.data.ledger.get(
+            tx.to_, sp.nat(0)) + tx.amount
+
+    @sp.offchain_view(pure=True)
+    def all_tokens(self):
+        """OffchainView: Return the list of all the token IDs known to the contract."""
+        sp.result([sp.nat(0)])
+
+    @sp.offchain_view(pure=True)
+    def all_tokens_page(self, params):
+        """OffchainView: Return the token IDs in `[offset, offset + limit)`
+        known to the contract."""
+        sp.set_type(params, t_page_params)
+        sp.result(sp.range(params.offset, sp.min(
+            params.offset + params.limit, 1)))
+
+    @sp.offchain_view(pure=True)
+    def live_token_count(self):
+        """OffchainView: Return the number of token IDs known to the
+        contract."""
+        sp.result(sp.nat(1))
 
 
 ##########
@@ -408,11 +1029,15 @@ class Admin:
     def is_administrator(self, sender):
         return sender == self.data.administrator
 
+    def set_administrator_(self, params):
+        """Body of `set_administrator`, shared with lazy variants."""
+        sp.verify(self.is_administrator(sp.sender), message="FA2_NOT_ADMIN")
+        self.data.administrator = params
+
     @sp.entry_point
     def set_administrator(self, params):
         """(Admin only) Set the contract administrator."""
-        sp.verify(self.is_administrator(sp.sender), message="FA2_NOT_ADMIN")
-        self.data.administrator = params
+        self.set_administrator_(params)
 
 
 class ChangeMetadata:
@@ -435,11 +1060,15 @@ class WithdrawMutez:
     Requires the `Admin` mixin.
     """
 
+    def withdraw_mutez_(self, destination, amount):
+        """Body of `withdraw_mutez`, shared with lazy variants."""
+        sp.verify(self.is_administrator(sp.sender), message="FA2_NOT_ADMIN")
+        sp.send(destination, amount)
+
     @sp.entry_point
     def withdraw_mutez(self, destination, amount):
         """(Admin only) Transfer `amount` mutez to `destination`."""
-        sp.verify(self.is_administrator(sp.sender), message="FA2_NOT_ADMIN")
-        sp.send(destination, amount)
+        self.withdraw_mutez_(destination, amount)
 
 
 class OffchainviewTokenMetadata:
@@ -475,37 +1104,276 @@ class OnchainviewBalanceOf:
         )
 
 
-class MintNft:
-    """(Mixin) Non-standard `mint` entrypoint for FA2Nft with incrementing id.
+class Permits:
+    """(Mixin) Transfers signed by the owners and submitted by anyone
+    (TZIP-17 style).
 
-    Requires the `Admin` mixin.
+    An owner signs `pack(((chain_id, self_address), (counter,
+    blake2b(pack(transfers)))))` where `counter` is its entry in
+    `permit_counters`. A relayer submits the signatures of several owners
+    in one `transfer_with_permits` operation, or registers them in advance
+    with `permit` and later calls `transfer_with_permits` without the
+    signature. Each signature can only be used once.
+
+    The signer must be the `from_` of every transfer it signs. The
+    transfers go through the policy like the ones made by the owner.
     """
 
-    @sp.entry_point
-    def mint(self, batch):
-        """Admin can mint new or existing tokens."""
-        sp.set_type(
-            batch,
-            sp.TList(
-                sp.TRecord(
-                    to_=sp.TAddress,
-                    metadata=sp.TMap(sp.TString, sp.TBytes),
-                ).layout(("to_", "metadata"))
+    def __init__(self):
+        self.update_initial_storage(
+            permits=sp.big_map(
+                tkey=sp.TPair(sp.TAddress, sp.TBytes), tvalue=sp.TUnit
             ),
+            permit_counters=sp.big_map(tkey=sp.TAddress, tvalue=sp.TNat),
         )
-        sp.verify(self.is_administrator(sp.sender), "FA2_NOT_ADMIN")
+
+    def permit_owner_(self, public_key):
+        """Return the address of `public_key`."""
+        return sp.to_address(sp.implicit_account(sp.hash_key(public_key)))
+
+    def check_permit_signature_(self, owner, public_key, signature, transfers_hash):
+        """Verify the signature by `owner` and increment its counter."""
+        counter = sp.compute(self.data.permit_counters.get(owner, default_value=0))
+        payload = sp.pack(
+            sp.pair(
+                sp.pair(sp.chain_id, sp.self_address),
+                sp.pair(counter, transfers_hash),
+            )
+        )
+        sp.verify(sp.check_signature(public_key, signature, payload),
+                  "FA2_INVALID_SIGNATURE")
+        self.data.permit_counters[owner] = counter + 1
+
+    @sp.entry_point
+    def permit(self, permits):
+        """Register signed transfers to be executed by
+        `transfer_with_permits`."""
+        sp.set_type(permits, t_permit_params)
+        with sp.for_("permit", permits) as permit:
+            owner = sp.compute(self.permit_owner_(permit.public_key))
+            self.check_permit_signature_(
+                owner, permit.public_key, permit.signature, permit.transfers_hash
+            )
+            self.data.permits[sp.pair(owner, permit.transfers_hash)] = sp.unit
+
+    @sp.entry_point
+    def transfer_with_permits(self, batch):
+        """Execute the transfers of several owners, each one authorized by
+        its signature or by a registered permit."""
+        sp.set_type(batch, t_transfer_with_permits_params)
+        if self.policy.supports_transfer:
+            check_batch_permissions(self.policy, self)
+            with sp.for_("item", batch) as item:
+                owner = sp.compute(self.permit_owner_(item.public_key))
+                transfers_hash = sp.compute(sp.blake2b(sp.pack(item.transfers)))
+                with sp.if_(item.signature.is_some()):
+                    self.check_permit_signature_(
+                        owner,
+                        item.public_key,
+                        item.signature.open_some(),
+                        transfers_hash,
+                    )
+                with sp.else_():
+                    key = sp.compute(sp.pair(owner, transfers_hash))
+                    sp.verify(self.data.permits.contains(key),
+                              "FA2_MISSING_PERMIT")
+                    del self.data.permits[key]
+                with sp.for_("transfer", item.transfers) as transfer:
+                    sp.verify(transfer.from_ == owner, "FA2_NOT_OWNER")
+                    with sp.for_("tx", transfer.txs) as tx:
+                        self.checked_transfer_tx_(
+                            transfer.from_, tx, sp.bool(True))
+                        if "transfer_with_permits" in self.emit_events:
+                            with sp.if_(tx.amount > 0):
+                                self.transfer_event_(
+                                    "transfer_with_permits", transfer.from_,
+                                    tx.to_, tx.token_id, tx.amount)
+        else:
+            sp.failwith("FA2_TX_DENIED")
+
+
+class MintNft:
+    """(Mixin) Non-standard `mint` entrypoint for FA2Nft with incrementing id.
+
+    Requires the `Admin` mixin.
+    """
+
+    @sp.entry_point
+    def mint(self, batch):
+        """Admin can mint new or existing tokens."""
+        sp.set_type(
+            batch,
+            sp.TList(
+                sp.TRecord(
+                    to_=sp.TAddress,
+                    metadata=sp.TMap(sp.TString, sp.TBytes),
+                ).layout(("to_", "metadata"))
+            ),
+        )
+        sp.verify(self.is_administrator(sp.sender), "FA2_NOT_ADMIN")
+        # Ids are assigned as a contiguous range, `last_token_id` is only
+        # written once.
+        token_id = sp.local("token_id", self.data.last_token_id)
+        with sp.for_("action", batch) as action:
+            metadata = sp.record(
+                token_id=token_id.value, token_info=action.metadata)
+            self.data.token_metadata[token_id.value] = metadata
+            self.data.ledger[token_id.value] = action.to_
+            self.owner_changed_(token_id.value, None, action.to_)
+            self.transfer_event_("mint", None, action.to_, token_id.value, 1)
+            token_id.value += 1
+        self.data.last_token_id = token_id.value
+
+
+class MetadataTemplates:
+    """(Mixin) Share token metadata fields between FA2Nft tokens.
+
+    The admin interns metadata maps in `metadata_templates` with the
+    `add_metadata_template` entrypoint. `mint_from_template` then stores,
+    for each token, only its template id (in `token_templates`) and the
+    fields that differ from the template (in `token_metadata`). The
+    `token_metadata` offchain view returns the merged metadata.
+
+    The `token_metadata` big_map only holds the overrides: TZIP-12 indexers
+    that read the big_map directly instead of calling the offchain view
+    show incomplete metadata for the tokens minted from a template.
+
+    Must be placed before `OffchainviewTokenMetadata` and `BurnNft` if
+    they are used. Requires the `Admin` mixin.
+    """
+
+    def __init__(self, templates=[]):
+        self.update_initial_storage(
+            metadata_templates=sp.big_map(
+                dict(enumerate(templates)),
+                tkey=sp.TNat,
+                tvalue=sp.TMap(sp.TString, sp.TBytes),
+            ),
+            last_template_id=sp.nat(len(templates)),
+            token_templates=sp.big_map(tkey=sp.TNat, tvalue=sp.TNat),
+        )
+
+    @sp.entry_point
+    def add_metadata_template(self, token_info):
+        """(Admin only) Store a new template under the next template id."""
+        sp.set_type(token_info, sp.TMap(sp.TString, sp.TBytes))
+        sp.verify(self.is_administrator(sp.sender), "FA2_NOT_ADMIN")
+        self.data.metadata_templates[self.data.last_template_id] = token_info
+        self.data.last_template_id += 1
+
+    @sp.entry_point
+    def mint_from_template(self, batch):
+        """Admin can mint new tokens referencing a template."""
+        sp.set_type(
+            batch,
+            sp.TList(
+                sp.TRecord(
+                    to_=sp.TAddress,
+                    template_id=sp.TNat,
+                    overrides=sp.TMap(sp.TString, sp.TBytes),
+                ).layout(("to_", ("template_id", "overrides")))
+            ),
+        )
+        sp.verify(self.is_administrator(sp.sender), "FA2_NOT_ADMIN")
+        token_id = sp.local("token_id", self.data.last_token_id)
         with sp.for_("action", batch) as action:
-            token_id = sp.compute(self.data.last_token_id)
-            metadata = sp.record(token_id=token_id, token_info=action.metadata)
-            self.data.token_metadata[token_id] = metadata
-            self.data.ledger[token_id] = action.to_
-            self.data.last_token_id += 1
+            sp.verify(action.template_id < self.data.last_template_id,
+                      "FA2_TEMPLATE_UNDEFINED")
+            self.mint_from_template_(
+                token_id.value, action.to_, action.template_id, action.overrides
+            )
+            token_id.value += 1
+        self.data.last_token_id = token_id.value
+
+    def mint_from_template_(self, token_id, to_, template_id, overrides):
+        """Mint `token_id` to `to_`, the template being already checked."""
+        self.data.token_metadata[token_id] = sp.record(
+            token_id=token_id, token_info=overrides
+        )
+        self.data.token_templates[token_id] = template_id
+        self.data.ledger[token_id] = to_
+        self.owner_changed_(token_id, None, to_)
+        self.transfer_event_("mint", None, to_, token_id, 1)
+
+    def token_burned_(self, token_id):
+        """Drop the template reference of the burnt `token_id`."""
+        del self.data.token_templates[token_id]
+        super().token_burned_(token_id)
+
+    @sp.offchain_view(pure=True)
+    def token_metadata(self, token_id):
+        """Returns the metadata of the given token, its template's fields
+        overridden by its own."""
+        sp.set_type(token_id, sp.TNat)
+        metadata = sp.local("metadata", self.data.token_metadata[token_id])
+        with sp.if_(self.data.token_templates.contains(token_id)):
+            token_info = sp.local(
+                "token_info",
+                self.data.metadata_templates[self.data.token_templates[token_id]],
+            )
+            with sp.for_("field", metadata.value.token_info.items()) as field:
+                token_info.value[field.key] = field.value
+            metadata.value.token_info = token_info.value
+        sp.result(metadata.value)
+
+
+class AirdropNft:
+    """(Mixin) Non-standard `airdrop` entrypoint minting one token per
+    recipient from a single metadata template.
+
+    The recipients are given as the concatenation of their 22 bytes binary
+    encoding (the end of `sp.pack(address)`, see
+    `tezos_encoding.pack_recipients`) instead of a list of records. They
+    get the contiguous ids starting at `last_token_id`.
+
+    Recipients per operation: these are estimates from the Micheline binary
+    encoding of the parameter, not measurements. A recipient costs 22 bytes
+    against about 99 for `mint` with a 53 bytes metadata URI, i.e. about
+    1480 recipients per 32 KB operation against about 330. Gas may cap a
+    batch before its size does: the "Benchmark airdrop" scenario gives the
+    gas of both entrypoints at 1, 10 and 100 recipients.
+
+    Requires the `Admin` and `MetadataTemplates` mixins.
+    """
+
+    @sp.entry_point
+    def airdrop(self, params):
+        """Admin can mint one token of a template to each recipient."""
+        sp.set_type(
+            params,
+            sp.TRecord(template_id=sp.TNat, recipients=sp.TBytes).layout(
+                ("template_id", "recipients")
+            ),
+        )
+        sp.verify(self.is_administrator(sp.sender), "FA2_NOT_ADMIN")
+        sp.verify(params.template_id < self.data.last_template_id,
+                  "FA2_TEMPLATE_UNDEFINED")
+        size = sp.compute(sp.len(params.recipients))
+        sp.verify(size % 22 == 0, "FA2_AIRDROP_INVALID_RECIPIENTS")
+        token_id = sp.local("token_id", self.data.last_token_id)
+        with sp.for_("offset", sp.range(0, size, 22)) as offset:
+            # Restore the PACK header of a 22 bytes address.
+            packed = sp.concat([
+                sp.bytes("0x050a00000016"),
+                sp.slice(params.recipients, offset, 22).open_some(),
+            ])
+            to_ = sp.compute(
+                sp.unpack(packed, sp.TAddress).open_some(
+                    "FA2_AIRDROP_INVALID_RECIPIENTS")
+            )
+            self.mint_from_template_(token_id.value, to_, params.template_id, {})
+            token_id.value += 1
+        self.data.last_token_id = token_id.value
 
 
 class BurnNft:
     """(Mixin) Non-standard `burn` entrypoint for FA2Nft that uses the transfer
     policy permission."""
 
+    def token_burned_(self, token_id):
+        """Called after `token_id` is burnt."""
+        pass
+
     @sp.entry_point
     def burn(self, batch):
         """Users can burn tokens if they have the transfer policy permission.
@@ -523,20 +1391,398 @@ class BurnNft:
             ),
         )
         sp.verify(self.policy.supports_transfer, "FA2_TX_DENIED")
+        check_batch_permissions(self.policy, self)
         with sp.for_("action", batch) as action:
-            sp.verify(self.is_defined(action.token_id), "FA2_TOKEN_UNDEFINED")
-            self.policy.check_tx_transfer_permissions(
-                self, action.from_, action.from_, action.token_id
+            owner = sp.compute(self.data.ledger.get_opt(action.token_id))
+            with sp.if_(owner.is_none()):
+                sp.verify(self.is_defined(action.token_id),
+                          "FA2_TOKEN_UNDEFINED")
+            check_tx_transfer_permissions(
+                self.policy, self, action.from_, action.from_, action.token_id
             )
             with sp.if_(action.amount > 0):
                 sp.verify(
                     (action.amount == sp.nat(1))
-                    & (self.data.ledger[action.token_id] == action.from_),
+                    & (owner == sp.some(action.from_)),
                     message="FA2_INSUFFICIENT_BALANCE",
                 )
                 # Burn the token
                 del self.data.ledger[action.token_id]
                 del self.data.token_metadata[action.token_id]
+                self.owner_changed_(action.token_id, action.from_, None)
+                self.transfer_event_(
+                    "burn", action.from_, None, action.token_id, 1)
+                self.token_burned_(action.token_id)
+
+
+class BurnNftTracked(BurnNft):
+    """(Mixin) `BurnNft` that keeps the burnt ids out of the token
+    enumeration views.
+
+    Burnt ids are recorded in the `burned` bitmap (bit `token_id % 256` of
+    word `token_id / 256`) so that the token enumeration views skip them
+    with one big_map read per 256 ids.
+
+    Adds storage: `BurnNftTracked.__init__` must be called.
+    """
+
+    def __init__(self):
+        self.update_initial_storage(
+            burned=sp.big_map(tkey=sp.TNat, tvalue=sp.TNat),
+            burned_count=sp.nat(0),
+        )
+
+    def live_tokens_(self, offset, end):
+        """Return the ids in `[offset, end)` that were not burnt."""
+        tokens = sp.local("tokens", sp.list(t=sp.TNat))
+        word = sp.local("word", sp.nat(0))
+        with sp.for_("token_id", sp.range(offset, end)) as token_id:
+            with sp.if_(((token_id & 255) == 0) | (token_id == offset)):
+                word.value = self.data.burned.get(
+                    token_id >> 8, default_value=sp.nat(0))
+            with sp.if_(((word.value >> (token_id & 255)) & 1) == 0):
+                tokens.value.push(token_id)
+        return tokens.value.rev()
+
+    @sp.offchain_view(pure=True)
+    def all_tokens(self):
+        """OffchainView: Return the list of all the token IDs known to the
+        contract that were not burnt."""
+        sp.result(self.live_tokens_(0, self.data.last_token_id))
+
+    @sp.offchain_view(pure=True)
+    def all_tokens_page(self, params):
+        """OffchainView: Return the token IDs in `[offset, offset + limit)`
+        known to the contract that were not burnt."""
+        sp.set_type(params, t_page_params)
+        sp.result(
+            self.live_tokens_(
+                params.offset,
+                sp.min(params.offset + params.limit, self.data.last_token_id),
+            )
+        )
+
+    @sp.offchain_view(pure=True)
+    def live_token_count(self):
+        """OffchainView: Return the number of token IDs known to the
+        contract that were not burnt."""
+        sp.result(sp.as_nat(self.data.last_token_id - self.data.burned_count))
+
+    def token_burned_(self, token_id):
+        """Set the bit of `token_id` in the `burned` bitmap."""
+        word = sp.compute(token_id >> 8)
+        self.data.burned[word] = self.data.burned.get(
+            word, default_value=sp.nat(0)
+        ) | (sp.nat(1) << (token_id & 255))
+        self.data.burned_count += 1
+
+
+class MintNftRange:
+    """(Mixin) Non-standard `mint` entrypoint for Fa2NftRange.
+
+    Each action mints `amount` tokens with incrementing ids to `to_`, the
+    cost grows by one `ledger` entry every `range_checkpoint` tokens.
+    `range_checkpoint` must be a positive number: without checkpoints the
+    owner lookup of a transfer is unbounded.
+
+    Requires the `Admin` mixin.
+    """
+
+    @sp.entry_point
+    def mint(self, batch):
+        """Admin can mint ranges of new tokens."""
+        sp.set_type(
+            batch,
+            sp.TList(
+                sp.TRecord(
+                    to_=sp.TAddress,
+                    amount=sp.TNat,
+                    metadata=sp.TMap(sp.TString, sp.TBytes),
+                ).layout(("to_", ("amount", "metadata")))
+            ),
+        )
+        if self.range_checkpoint is None or self.range_checkpoint < 1:
+            raise Exception("range_checkpoint must be a positive number")
+        sp.verify(self.is_administrator(sp.sender), "FA2_NOT_ADMIN")
+        first = sp.local("first", self.data.last_token_id)
+        with sp.for_("action", batch) as action:
+            with sp.if_(action.amount > 0):
+                self.data.token_metadata[first.value] = sp.record(
+                    token_id=first.value, token_info=action.metadata
+                )
+                end = sp.compute(first.value + action.amount)
+                with sp.for_(
+                    "checkpoint",
+                    sp.range(first.value, end, self.range_checkpoint),
+                ) as token_id:
+                    self.data.ledger[token_id] = action.to_
+                # One event per token: the cost grows with `amount` when
+                # the events are enabled.
+                if "mint" in self.emit_events:
+                    with sp.for_("minted", sp.range(first.value, end)) as token_id:
+                        self.transfer_event_(
+                            "mint", None, action.to_, token_id, 1)
+                first.value = end
+        self.data.last_token_id = first.value
+
+
+class OwnerTokensIndex:
+    """(Mixin) Index the tokens of each owner for FA2Nft.
+
+    The tokens of an owner are numbered from 0 to `owner_token_count - 1`:
+    `owner_token_at` maps `(owner, index)` to the token id and
+    `owner_token_index` maps `(owner, token_id)` back to its index. When a
+    token leaves an owner, its last indexed token takes its index. Every
+    entry has a constant size so transfers, mints and burns cost the same
+    whatever the number of tokens the owners hold.
+
+    Adds the `tokens_of_owner` and `balance_count` offchain views.
+
+    Must be placed before the base class and initialized after it. Not
+    compatible with `MintNftRange`.
+    """
+
+    def __init__(self):
+        token_at = {}
+        token_index = {}
+        count = {}
+        for token_id, owner in self.initial_ledger.items():
+            index = count.get(owner, 0)
+            token_at[(owner, index)] = token_id
+            token_index[(owner, token_id)] = index
+            count[owner] = index + 1
+        self.update_initial_storage(
+            owner_token_at=sp.big_map(
+                token_at, tkey=sp.TPair(sp.TAddress, sp.TNat), tvalue=sp.TNat
+            ),
+            owner_token_index=sp.big_map(
+                token_index, tkey=sp.TPair(sp.TAddress, sp.TNat), tvalue=sp.TNat
+            ),
+            owner_token_count=sp.big_map(
+                count, tkey=sp.TAddress, tvalue=sp.TNat),
+        )
+
+    def owner_changed_(self, token_id, from_, to_):
+        if from_ is not None:
+            index = sp.compute(self.data.owner_token_index[(from_, token_id)])
+            last_index = sp.compute(
+                sp.as_nat(self.data.owner_token_count[from_] - 1))
+            last = sp.compute(self.data.owner_token_at[(from_, last_index)])
+            self.data.owner_token_at[(from_, index)] = last
+            self.data.owner_token_index[(from_, last)] = index
+            del self.data.owner_token_at[(from_, last_index)]
+            del self.data.owner_token_index[(from_, token_id)]
+            with sp.if_(last_index == 0):
+                del self.data.owner_token_count[from_]
+            with sp.else_():
+                self.data.owner_token_count[from_] = last_index
+        if to_ is not None:
+            count = sp.compute(
+                self.data.owner_token_count.get(to_, default_value=sp.nat(0)))
+            self.data.owner_token_at[(to_, count)] = token_id
+            self.data.owner_token_index[(to_, token_id)] = count
+            self.data.owner_token_count[to_] = count + 1
+
+    @sp.offchain_view(pure=True)
+    def tokens_of_owner(self, params):
+        """Return the token IDs of `owner` with an index in
+        `[offset, offset + limit)`."""
+        sp.set_type(
+            params,
+            sp.TRecord(owner=sp.TAddress, offset=sp.TNat, limit=sp.TNat).layout(
+                ("owner", ("offset", "limit"))
+            ),
+        )
+        page = sp.local("page", sp.list(t=sp.TNat))
+        end = sp.compute(
+            sp.min(
+                params.offset + params.limit,
+                self.data.owner_token_count.get(
+                    params.owner, default_value=sp.nat(0)),
+            )
+        )
+        with sp.for_("index", sp.range(params.offset, end)) as index:
+            page.value.push(self.data.owner_token_at[(params.owner, index)])
+        sp.result(page.value.rev())
+
+    @sp.offchain_view(pure=True)
+    def balance_count(self, owner):
+        """Return the number of tokens owned by `owner`."""
+        sp.set_type(owner, sp.TAddress)
+        sp.result(
+            self.data.owner_token_count.get(owner, default_value=sp.nat(0)))
+
+
+class MintFungible:
+    """(Mixin) Non-standard `mint` entrypoint for FA2Fungible with
+    incrementing id.
+
+    Requires the `Admin` mixin.
+    """
+
+    @sp.entry_point
+    def mint(self, batch):
+        """Admin can mint new or existing tokens."""
+        sp.set_type(
+            batch,
+            sp.TList(
+                sp.TRecord(
+                    to_=sp.TAddress,
+                    token=sp.TVariant(
+                        new=sp.TMap(sp.TString, sp.TBytes), existing=sp.TNat
+                    ),
+                    amount=sp.TNat,
+                ).layout(("to_", ("token", "amount")))
+            ),
+        )
+        sp.verify(self.is_administrator(sp.sender), "FA2_NOT_ADMIN")
+        last_token_id = sp.local("last_token_id", self.data.last_token_id)
+        with sp.for_("action", batch) as action:
+            with action.token.match_cases() as arg:
+                with arg.match("new") as metadata:
+                    token_id = sp.compute(last_token_id.value)
+                    self.data.token_metadata[token_id] = sp.record(
+                        token_id=token_id, token_info=metadata
+                    )
+                    with sp.if_(action.amount > 0):
+                        self.data.supply[token_id] = action.amount
+                        self.data.ledger[(action.to_, token_id)
+                                         ] = action.amount
+                        self.transfer_event_(
+                            "mint", None, action.to_, token_id, action.amount)
+                    last_token_id.value += 1
+                with arg.match("existing") as token_id:
+                    sp.verify(self.is_defined(token_id),
+                              "FA2_TOKEN_UNDEFINED")
+                    with sp.if_(action.amount > 0):
+                        self.data.supply[token_id] = (
+                            self.data.supply.get(token_id, sp.nat(0))
+                            + action.amount
+                        )
+                        to_ = sp.compute((action.to_, token_id))
+                        self.data.ledger[to_] = (
+                            self.data.ledger.get(to_, sp.nat(0)) + action.amount
+                        )
+                        self.transfer_event_(
+                            "mint", None, action.to_, token_id, action.amount)
+        self.data.last_token_id = last_token_id.value
+
+
+class BurnFungible:
+    """(Mixin) Non-standard `burn` entrypoint for FA2Fungible that uses the
+    transfer policy permission."""
+
+    @sp.entry_point
+    def burn(self, batch):
+        """Users can burn tokens if they have the transfer policy
+        permission."""
+        sp.set_type(
+            batch,
+            sp.TList(
+                sp.TRecord(
+                    from_=sp.TAddress,
+                    token_id=sp.TNat,
+                    amount=sp.TNat,
+                ).layout(("from_", ("token_id", "amount")))
+            ),
+        )
+        sp.verify(self.policy.supports_transfer, "FA2_TX_DENIED")
+        check_batch_permissions(self.policy, self)
+        with sp.for_("action", batch) as action:
+            sp.verify(self.is_defined(action.token_id), "FA2_TOKEN_UNDEFINED")
+            check_tx_transfer_permissions(
+                self.policy, self, action.from_, action.from_, action.token_id
+            )
+            with sp.if_(action.amount > 0):
+                from_ = sp.compute((action.from_, action.token_id))
+                self.set_balance_(
+                    from_,
+                    sp.as_nat(
+                        self.data.ledger.get(from_, sp.nat(0)) - action.amount,
+                        message="FA2_INSUFFICIENT_BALANCE",
+                    ),
+                )
+                supply = sp.compute(
+                    sp.as_nat(
+                        self.data.supply.get(action.token_id, sp.nat(0))
+                        - action.amount
+                    )
+                )
+                with sp.if_(supply == 0):
+                    del self.data.supply[action.token_id]
+                with sp.else_():
+                    self.data.supply[action.token_id] = supply
+                self.transfer_event_(
+                    "burn", action.from_, None, action.token_id, action.amount)
+
+
+class MintSingleAsset:
+    """(Mixin) Non-standard `mint` entrypoint for FA2SingleAsset.
+
+    Requires the `Admin` mixin.
+    """
+
+    @sp.entry_point
+    def mint(self, batch):
+        """Admin can mint tokens."""
+        sp.set_type(
+            batch,
+            sp.TList(
+                sp.TRecord(to_=sp.TAddress, amount=sp.TNat).layout(
+                    ("to_", "amount"))
+            ),
+        )
+        sp.verify(self.is_administrator(sp.sender), "FA2_NOT_ADMIN")
+        supply = sp.local("supply", self.data.supply)
+        with sp.for_("action", batch) as action:
+            with sp.if_(action.amount > 0):
+                self.data.ledger[action.to_] = (
+                    self.data.ledger.get(action.to_, sp.nat(0)) + action.amount
+                )
+                supply.value += action.amount
+                self.transfer_event_("mint", None, action.to_, 0, action.amount)
+        self.data.supply = supply.value
+
+
+class BurnSingleAsset:
+    """(Mixin) Non-standard `burn` entrypoint for FA2SingleAsset that uses
+    the transfer policy permission."""
+
+    @sp.entry_point
+    def burn(self, batch):
+        """Users can burn tokens if they have the transfer policy
+        permission."""
+        sp.set_type(
+            batch,
+            sp.TList(
+                sp.TRecord(
+                    from_=sp.TAddress,
+                    token_id=sp.TNat,
+                    amount=sp.TNat,
+                ).layout(("from_", ("token_id", "amount")))
+            ),
+        )
+        sp.verify(self.policy.supports_transfer, "FA2_TX_DENIED")
+        check_batch_permissions(self.policy, self)
+        supply = sp.local("supply", self.data.supply)
+        with sp.for_("action", batch) as action:
+            sp.verify(self.is_defined(action.token_id), "FA2_TOKEN_UNDEFINED")
+            check_tx_transfer_permissions(
+                self.policy, self, action.from_, action.from_, action.token_id
+            )
+            with sp.if_(action.amount > 0):
+                self.set_balance_(
+                    action.from_,
+                    sp.as_nat(
+                        self.data.ledger.get(
+                            action.from_, sp.nat(0)) - action.amount,
+                        message="FA2_INSUFFICIENT_BALANCE",
+                    ),
+                )
+                supply.value = sp.as_nat(supply.value - action.amount)
+                self.transfer_event_(
+                    "burn", action.from_, None, action.token_id, action.amount)
+        self.data.supply = supply.value
 
 
 ###########
@@ -596,7 +1842,7 @@ if "templates" not in __name__:
         ChangeMetadata,
         WithdrawMutez,
         MintNft,
-        BurnNft,
+        BurnNftTracked,
         OnchainviewBalanceOf,
         OffchainviewTokenMetadata,
         Fa2Nft,
@@ -606,6 +1852,105 @@ if "templates" not in __name__:
         def __init__(self, **kwargs):
             Fa2Nft.__init__(self, **kwargs)
             Admin.__init__(self, admin.address)
+            BurnNftTracked.__init__(self)
+
+    class NftIndexTest(
+        Admin,
+        MintNft,
+        BurnNft,
+        OwnerTokensIndex,
+        Fa2Nft,
+    ):
+        """NFT contract with the owner to tokens index."""
+
+        def __init__(self, **kwargs):
+            Fa2Nft.__init__(self, **kwargs)
+            Admin.__init__(self, admin.address)
+            OwnerTokensIndex.__init__(self)
+
+    class NftTemplateTest(
+        Admin,
+        AirdropNft,
+        MetadataTemplates,
+        BurnNft,
+        MintNft,
+        Fa2Nft,
+    ):
+        """NFT contract with metadata templates."""
+
+        def __init__(self, templates=[], **kwargs):
+            Fa2Nft.__init__(self, **kwargs)
+            Admin.__init__(self, admin.address)
+            MetadataTemplates.__init__(self, templates)
+
+    class NftEventsTest(NftTest):
+        """NftTest emitting events from all its entrypoints."""
+
+        emit_events = ("transfer", "mint", "burn", "update_operators")
+
+    class NftPermitsTest(Permits, Fa2Nft):
+        """NFT contract with permits."""
+
+        def __init__(self, **kwargs):
+            Fa2Nft.__init__(self, **kwargs)
+            Permits.__init__(self)
+
+    class NftHotFieldsTest(NftTest):
+        """NftTest with the transfer fields at the top of the storage."""
+
+        storage_access_frequency = {
+            "ledger": 3,
+            "operators": 2,
+            "paused": 2,
+            "token_metadata": 1,
+        }
+
+    class NftRangeTest(
+        Admin,
+        MintNftRange,
+        OnchainviewBalanceOf,
+        Fa2NftRange,
+    ):
+        """Range NFT contract with the mint mixin."""
+
+        def __init__(self, **kwargs):
+            Fa2NftRange.__init__(self, **kwargs)
+            Admin.__init__(self, admin.address)
+
+    class NftRangeSparseCheckpointTest(NftRangeTest):
+        range_checkpoint = 1024
+
+    class FungibleTest(
+        Admin,
+        ChangeMetadata,
+        WithdrawMutez,
+        MintFungible,
+        BurnFungible,
+        OnchainviewBalanceOf,
+        OffchainviewTokenMetadata,
+        Fa2Fungible,
+    ):
+        """Fungible contract with all optional features."""
+
+        def __init__(self, **kwargs):
+            Fa2Fungible.__init__(self, **kwargs)
+            Admin.__init__(self, admin.address)
+
+    class SingleAssetTest(
+        Admin,
+        ChangeMetadata,
+        WithdrawMutez,
+        MintSingleAsset,
+        BurnSingleAsset,
+        OnchainviewBalanceOf,
+        OffchainviewTokenMetadata,
+        Fa2SingleAsset,
+    ):
+        """Single asset contract with all optional features."""
+
+        def __init__(self, **kwargs):
+            Fa2SingleAsset.__init__(self, **kwargs)
+            Admin.__init__(self, admin.address)
 
     def _pre_minter(base_class=Fa2Nft, policy=None):
         if base_class.ledger_type == "NFT":
@@ -629,16 +1974,19 @@ if "templates" not in __name__:
         )
 
     # Standard features
-    for _Fa2 in [Fa2Nft]:
+    for _Fa2 in [Fa2Nft, Fa2NftRange, Fa2Fungible, Fa2SingleAsset]:
         TESTS.test_core_interfaces(_pre_minter(_Fa2))
         TESTS.test_transfer(_pre_minter(_Fa2))
         TESTS.test_balance_of(_pre_minter(_Fa2))
         TESTS.test_no_transfer(_pre_minter(_Fa2, policy=NoTransfer()))
         TESTS.test_owner_transfer(_pre_minter(_Fa2, policy=OwnerTransfer()))
         TESTS.test_owner_or_operator_transfer(_pre_minter(_Fa2))
+        TESTS.test_owner_or_operator_transfer(
+            _pre_minter(_Fa2, policy=OwnerOrOperatorForAllTransfer())
+        )
 
     # Non standard features
-    for _Fa2 in [NftTest]:
+    for _Fa2 in [NftTest, FungibleTest, SingleAssetTest]:
         token_metadata = tok0_md if _Fa2.ledger_type == "SingleAsset" else []
         TESTS.NS.test_admin(_Fa2(metadata=METADATA))
         TESTS.NS.test_mint(
@@ -649,3 +1997,647 @@ if "templates" not in __name__:
         TESTS.NS.test_offchain_token_metadata(_pre_minter(_Fa2))
         TESTS.NS.test_get_balance_of(_pre_minter(_Fa2))
         TESTS.NS.test_pause(_pre_minter(_Fa2, policy=PauseTransfer()))
+
+    ##############
+    # Benchmarks #
+    ##############
+
+    # Run with the SmartPy CLI and read the consumed gas of each call.
+
+    class Fa2NftTwoLookups(Fa2Nft):
+        """Fa2Nft with the generic `is_defined` + `ledger` transfer path."""
+
+        checked_transfer_tx_ = Common.checked_transfer_tx_
+
+    class NftBalanceOfPerRequest(Fa2Nft):
+        """Fa2Nft with the generic per request `balance_of_batch`."""
+
+        balance_of_batch = Common.balance_of_batch
+
+    class EagerOwnerOrOperatorTransfer(OwnerOrOperatorTransfer):
+        """OwnerOrOperatorTransfer reading `operators` even for owners."""
+
+        def check_tx_transfer_permissions(
+            self, contract, from_, to_, token_id, sender_is_owner=None
+        ):
+            sp.verify(
+                (sp.sender == from_)
+                | contract.data.operators.contains(
+                    sp.record(owner=from_, operator=sp.sender,
+                              token_id=token_id)
+                ),
+                message="FA2_NOT_OPERATOR",
+            )
+
+    class LegacyOwnerTransfer:
+        """Policy written against the interface without the batch hook and
+        without `sender_is_owner`."""
+
+        def init_policy(self, contract):
+            self.name = "legacy-owner-transfer"
+            self.supports_transfer = True
+            self.supports_operator = False
+
+        def check_tx_transfer_permissions(self, contract, from_, to_, token_id):
+            sp.verify(sp.sender == from_, "FA2_NOT_OWNER")
+
+        def check_operator_update_permissions(self, contract, operator_permission):
+            pass
+
+        def is_operator(self, contract, operator_permission):
+            return False
+
+    def _nft_collection(base_class, size, owner, policy=None):
+        return base_class(
+            metadata=METADATA,
+            token_metadata=[tok0_md] * size,
+            ledger={token_id: owner for token_id in range(size)},
+            policy=policy,
+        )
+
+    def _transfer_batch(from_, to_, token_ids):
+        return [
+            sp.record(
+                from_=from_,
+                txs=[sp.record(to_=to_, token_id=token_id, amount=1)
+                     for token_id in token_ids],
+            )
+        ]
+
+    @sp.add_test(name="Benchmark NFT transfer batches")
+    def test():
+        sc = sp.test_scenario()
+        for _Fa2 in [Fa2NftTwoLookups, Fa2Nft]:
+            sc.h2(_Fa2.__name__)
+            c = _nft_collection(_Fa2, 111, alice.address)
+            sc += c
+            first = 0
+            for size in [1, 10, 100]:
+                sc.h3("%d txs" % size)
+                c.transfer(
+                    _transfer_batch(alice.address, admin.address,
+                                    range(first, first + size))
+                ).run(sender=alice)
+                first += size
+
+    @sp.add_test(name="Benchmark NFT mint batches")
+    def test():
+        sc = sp.test_scenario()
+        c = NftTest(metadata=METADATA)
+        sc += c
+        for size in [1, 10, 100]:
+            sc.h3("%d tokens" % size)
+            c.mint(
+                [sp.record(to_=alice.address, metadata=tok0_md)] * size
+            ).run(sender=admin)
+        sc.verify(c.data.last_token_id == 111)
+
+    @sp.add_test(name="Benchmark approve-all operators")
+    def test():
+        sc = sp.test_scenario()
+        size = 100
+        token_ids = range(size)
+        for policy in [OwnerOrOperatorTransfer(), OwnerOrOperatorForAllTransfer()]:
+            sc.h2(policy.__class__.__name__)
+            c = Fa2Nft(
+                metadata=METADATA,
+                token_metadata=[tok0_md] * size,
+                ledger={token_id: alice.address for token_id in token_ids},
+                policy=policy,
+            )
+            sc += c
+            sc.h3("Approve %d tokens" % size)
+            if isinstance(policy, OwnerOrOperatorForAllTransfer):
+                c.update_operators_for_all(
+                    [
+                        sp.variant(
+                            "add_operator",
+                            sp.record(owner=alice.address,
+                                      operator=admin.address),
+                        )
+                    ]
+                ).run(sender=alice)
+            else:
+                c.update_operators(
+                    [
+                        sp.variant(
+                            "add_operator",
+                            sp.record(owner=alice.address,
+                                      operator=admin.address, token_id=token_id),
+                        )
+                        for token_id in token_ids
+                    ]
+                ).run(sender=alice)
+            sc.h3("Operator transfer")
+            c.transfer(
+                _transfer_batch(alice.address, admin.address, range(10))
+            ).run(sender=admin)
+
+    @sp.add_test(name="Benchmark NFT balance_of")
+    def test():
+        sc = sp.test_scenario()
+        receiver = TestReceiverBalanceOf()
+        sc += receiver
+        owners = [alice.address, admin.address]
+        for _Fa2 in [NftBalanceOfPerRequest, Fa2Nft]:
+            sc.h2(_Fa2.__name__)
+            c = _nft_collection(_Fa2, 10, alice.address)
+            sc += c
+            for size in [1, 10]:
+                sc.h3("%d tokens, %d owners each" % (size, len(owners)))
+                c.balance_of(
+                    sp.record(
+                        requests=[
+                            sp.record(owner=owner, token_id=token_id)
+                            for token_id in range(size)
+                            for owner in owners
+                        ],
+                        callback=sp.contract(
+                            sp.TList(t_balance_of_response),
+                            receiver.address,
+                            entry_point="receive_balances",
+                        ).open_some(),
+                    )
+                )
+                sc.verify(receiver.data.last_known_balances[c.address][
+                    (alice.address, size - 1)] == 1)
+                sc.verify(receiver.data.last_known_balances[c.address][
+                    (admin.address, size - 1)] == 0)
+
+    @sp.add_test(name="Benchmark paused policy transfer batches")
+    def test():
+        sc = sp.test_scenario()
+        c = NftTest(
+            metadata=METADATA,
+            token_metadata=[tok0_md] * 100,
+            ledger={token_id: alice.address for token_id in range(100)},
+            policy=PauseTransfer(),
+        )
+        sc += c
+        c.transfer(
+            _transfer_batch(alice.address, admin.address, range(100))
+        ).run(sender=alice)
+        c.set_pause(True).run(sender=admin)
+        c.transfer(
+            _transfer_batch(admin.address, alice.address, range(100))
+        ).run(sender=admin, valid=False,
+              exception=sp.pair("FA2_TX_DENIED", "FA2_PAUSED"))
+
+    @sp.add_test(name="Policy without batch hook")
+    def test():
+        sc = sp.test_scenario()
+        for policy in [LegacyOwnerTransfer(),
+                       PauseTransfer(LegacyOwnerTransfer())]:
+            sc.h2(policy.__class__.__name__)
+            c = _nft_collection(NftTest, 3, alice.address, policy)
+            sc += c
+            c.transfer(
+                _transfer_batch(alice.address, admin.address, [0])
+            ).run(sender=alice)
+            c.transfer(
+                _transfer_batch(alice.address, admin.address, [1])
+            ).run(sender=admin, valid=False, exception="FA2_NOT_OWNER")
+            c.burn([sp.record(from_=alice.address, token_id=1, amount=1)]
+                   ).run(sender=alice)
+            sc.verify(c.data.ledger[0] == admin.address)
+            sc.verify(~c.data.ledger.contains(1))
+
+    @sp.add_test(name="Benchmark owner and operator transfers")
+    def test():
+        sc = sp.test_scenario()
+        for policy in [EagerOwnerOrOperatorTransfer(), OwnerOrOperatorTransfer()]:
+            sc.h2(policy.__class__.__name__)
+            c = _nft_collection(Fa2Nft, 20, alice.address, policy)
+            sc += c
+            sc.h3("Owner transfer, 10 txs")
+            c.transfer(
+                _transfer_batch(alice.address, alice.address, range(10))
+            ).run(sender=alice)
+            c.update_operators(
+                [
+                    sp.variant(
+                        "add_operator",
+                        sp.record(owner=alice.address,
+                                  operator=admin.address, token_id=token_id),
+                    )
+                    for token_id in range(10, 20)
+                ]
+            ).run(sender=alice)
+            sc.h3("Operator transfer, 10 txs")
+            c.transfer(
+                _transfer_batch(alice.address, admin.address, range(10, 20))
+            ).run(sender=admin)
+
+    @sp.add_test(name="Benchmark NFT range mint")
+    def test():
+        sc = sp.test_scenario()
+        for _Fa2 in [NftRangeTest, NftRangeSparseCheckpointTest]:
+            sc.h2("%s, range_checkpoint=%s" % (_Fa2.__name__, _Fa2.range_checkpoint))
+            c = _Fa2(metadata=METADATA)
+            sc += c
+            first = 0
+            for size in [1, 100, 1000, 10000]:
+                sc.h3("Mint %d tokens" % size)
+                c.mint(
+                    [sp.record(to_=alice.address,
+                               amount=size, metadata=tok0_md)]
+                ).run(sender=admin)
+                sc.h3("Transfer the last one (worst-case lookup)")
+                c.transfer(
+                    _transfer_batch(alice.address, admin.address,
+                                    [first + size - 1])
+                ).run(sender=alice)
+                first += size
+            sc.verify(c.data.last_token_id == first)
+
+    @sp.add_test(name="NFT range split")
+    def test():
+        sc = sp.test_scenario()
+        c = NftRangeTest(metadata=METADATA)
+        sc += c
+        c.mint(
+            [
+                sp.record(to_=alice.address, amount=200, metadata=tok0_md),
+                sp.record(to_=admin.address, amount=10, metadata=tok1_md),
+            ]
+        ).run(sender=admin)
+        # Checkpoints every 64 ids, then the next range.
+        sc.verify(c.data.ledger[0] == alice.address)
+        sc.verify(c.data.ledger[64] == alice.address)
+        sc.verify(c.data.ledger[192] == alice.address)
+        sc.verify(~c.data.ledger.contains(1))
+        sc.verify(c.data.ledger[200] == admin.address)
+        c.transfer(
+            _transfer_batch(alice.address, admin.address, [10])
+        ).run(sender=alice)
+        sc.verify(c.data.ledger[10] == admin.address)
+        sc.verify(c.data.ledger[11] == alice.address)
+        # Ids around the split keep their owner.
+        c.transfer(
+            _transfer_batch(alice.address, admin.address, [9, 12, 199])
+        ).run(sender=alice)
+        c.transfer(
+            _transfer_batch(alice.address, admin.address, [10])
+        ).run(sender=alice, valid=False, exception="FA2_INSUFFICIENT_BALANCE")
+        c.transfer(
+            _transfer_batch(admin.address, alice.address, [205])
+        ).run(sender=admin)
+        sc.verify(c.data.ledger[205] == alice.address)
+        sc.verify(c.data.ledger[206] == admin.address)
+        c.transfer(
+            _transfer_batch(admin.address, alice.address, [210])
+        ).run(sender=admin, valid=False, exception="FA2_TOKEN_UNDEFINED")
+
+    @sp.add_test(name="Owner tokens index")
+    def test():
+        sc = sp.test_scenario()
+        c = _pre_minter(NftIndexTest)
+        sc += c
+
+        def verify_index(owner, token_ids):
+            sc.verify(c.data.owner_token_count[owner] == len(token_ids))
+            for index, token_id in enumerate(token_ids):
+                sc.verify(c.data.owner_token_at[(owner, index)] == token_id)
+                sc.verify(c.data.owner_token_index[(owner, token_id)] == index)
+
+        verify_index(alice.address, [0, 1, 2])
+        # Token 2 takes the index of token 0, then token 1 the one of 2.
+        c.transfer(
+            _transfer_batch(alice.address, admin.address, [0, 2])
+        ).run(sender=alice)
+        c.mint([sp.record(to_=admin.address, metadata=tok0_md)]
+               ).run(sender=admin)
+        verify_index(alice.address, [1])
+        verify_index(admin.address, [0, 2, 3])
+        sc.verify(~c.data.owner_token_at.contains((alice.address, 1)))
+        c.burn(
+            [sp.record(from_=alice.address, token_id=1, amount=1)]
+        ).run(sender=alice)
+        sc.verify(~c.data.owner_token_count.contains(alice.address))
+        sc.verify(~c.data.owner_token_at.contains((alice.address, 0)))
+        sc.verify(~c.data.owner_token_index.contains((alice.address, 1)))
+
+    @sp.add_test(name="Benchmark owner tokens index")
+    def test():
+        sc = sp.test_scenario()
+        for _Fa2 in [NftTest, NftIndexTest]:
+            sc.h2(_Fa2.__name__)
+            c = _nft_collection(_Fa2, 100, alice.address)
+            sc += c
+            for size in [1, 10]:
+                sc.h3("Transfer %d txs" % size)
+                c.transfer(
+                    _transfer_batch(alice.address, admin.address, range(size))
+                ).run(sender=alice)
+                c.transfer(
+                    _transfer_batch(admin.address, alice.address, range(size))
+                ).run(sender=admin)
+            sc.h3("Mint 10 tokens")
+            c.mint([sp.record(to_=alice.address, metadata=tok0_md)] * 10
+                   ).run(sender=admin)
+
+    @sp.add_test(name="Metadata templates")
+    def test():
+        sc = sp.test_scenario()
+        c = NftTemplateTest(metadata=METADATA, templates=[tok0_md])
+        sc += c
+        c.add_metadata_template(tok1_md).run(sender=alice, valid=False,
+                                             exception="FA2_NOT_ADMIN")
+        c.add_metadata_template(tok1_md).run(sender=admin)
+        name = sp.map({"name": sp.utils.bytes_of_string("Token Zero #1")})
+        c.mint_from_template(
+            [
+                sp.record(to_=alice.address, template_id=0, overrides=name),
+                sp.record(to_=alice.address, template_id=1, overrides={}),
+            ]
+        ).run(sender=admin)
+        c.mint_from_template(
+            [sp.record(to_=alice.address, template_id=2, overrides={})]
+        ).run(sender=admin, valid=False, exception="FA2_TEMPLATE_UNDEFINED")
+        sc.verify(c.data.last_token_id == 2)
+        sc.verify(c.data.token_metadata[0].token_info == name)
+        sc.verify(c.data.token_templates[1] == 1)
+        sc.verify(c.data.ledger[1] == alice.address)
+        # Burning a token drops its template reference.
+        c.burn([sp.record(from_=alice.address, token_id=1, amount=1)]
+               ).run(sender=alice)
+        sc.verify(~c.data.token_templates.contains(1))
+        sc.verify(c.data.token_templates[0] == 0)
+
+    @sp.add_test(name="Benchmark metadata templates")
+    def test():
+        sc = sp.test_scenario()
+        c = NftTemplateTest(metadata=METADATA, templates=[tok0_md])
+        sc += c
+        for size in [1, 10, 100]:
+            sc.h3("Mint %d tokens with full metadata" % size)
+            c.mint([sp.record(to_=alice.address, metadata=tok0_md)] * size
+                   ).run(sender=admin)
+            sc.h3("Mint %d tokens from a template" % size)
+            c.mint_from_template(
+                [sp.record(to_=alice.address, template_id=0, overrides={})] * size
+            ).run(sender=admin)
+
+    def _recipients(addresses):
+        """`tezos_encoding.pack_recipients` computed by the scenario."""
+        return sp.concat(
+            [sp.slice(sp.pack(address), 6, 22).open_some()
+             for address in addresses]
+        )
+
+    @sp.add_test(name="Airdrop")
+    def test():
+        sc = sp.test_scenario()
+        c = NftTemplateTest(metadata=METADATA, templates=[tok0_md])
+        sc += c
+        recipients = _recipients([alice.address, bob.address, c.address])
+        c.airdrop(sp.record(template_id=0, recipients=recipients)).run(
+            sender=alice, valid=False, exception="FA2_NOT_ADMIN")
+        c.airdrop(sp.record(template_id=1, recipients=recipients)).run(
+            sender=admin, valid=False, exception="FA2_TEMPLATE_UNDEFINED")
+        c.airdrop(
+            sp.record(template_id=0, recipients=sp.bytes("0x0000"))
+        ).run(sender=admin, valid=False,
+              exception="FA2_AIRDROP_INVALID_RECIPIENTS")
+        c.airdrop(sp.record(template_id=0, recipients=recipients)).run(
+            sender=admin)
+        sc.verify(c.data.last_token_id == 3)
+        sc.verify(c.data.ledger[0] == alice.address)
+        sc.verify(c.data.ledger[1] == bob.address)
+        sc.verify(c.data.ledger[2] == c.address)
+        sc.verify(c.data.token_templates[2] == 0)
+        c.airdrop(sp.record(template_id=0, recipients=sp.bytes("0x"))).run(
+            sender=admin)
+        sc.verify(c.data.last_token_id == 3)
+
+    @sp.add_test(name="Benchmark airdrop")
+    def test():
+        sc = sp.test_scenario()
+        c = NftTemplateTest(metadata=METADATA, templates=[tok0_md])
+        sc += c
+        for size in [1, 10, 100]:
+            sc.h3("Mint %d tokens with full metadata" % size)
+            c.mint([sp.record(to_=alice.address, metadata=tok0_md)] * size
+                   ).run(sender=admin)
+            sc.h3("Airdrop %d tokens" % size)
+            c.airdrop(
+                sp.record(template_id=0,
+                          recipients=_recipients([alice.address] * size))
+            ).run(sender=admin)
+
+    CHAIN_ID = sp.chain_id_cst("0x9caecab9")
+
+    def _permit_signature(signer, contract, counter, transfers):
+        """Signature by `signer` of `transfers` for the `Permits` mixin."""
+        return sp.make_signature(
+            signer.secret_key,
+            sp.pack(
+                sp.pair(
+                    sp.pair(CHAIN_ID, contract.address),
+                    sp.pair(sp.nat(counter), sp.blake2b(sp.pack(transfers))),
+                )
+            ),
+            message_format="Raw",
+        )
+
+    @sp.add_test(name="Permits")
+    def test():
+        sc = sp.test_scenario()
+        bob = sp.test_account("Bob")
+        cat = sp.test_account("Cat")
+        relayer = sp.test_account("Relayer")
+        c = NftPermitsTest(
+            metadata=METADATA,
+            token_metadata=[tok0_md] * 4,
+            ledger={0: alice.address, 1: bob.address, 2: cat.address,
+                    3: cat.address},
+        )
+        sc += c
+
+        def transfers(from_, to_, token_id):
+            return sp.set_type_expr(
+                _transfer_batch(from_.address, to_.address, [token_id]),
+                t_transfer_params,
+            )
+
+        sc.h3("Several signers in one operation")
+        alice_txs = transfers(alice, bob, 0)
+        bob_txs = transfers(bob, cat, 1)
+        batch = [
+            sp.record(
+                public_key=alice.public_key,
+                signature=sp.some(_permit_signature(alice, c, 0, alice_txs)),
+                transfers=alice_txs,
+            ),
+            sp.record(
+                public_key=bob.public_key,
+                signature=sp.some(_permit_signature(bob, c, 0, bob_txs)),
+                transfers=bob_txs,
+            ),
+        ]
+        c.transfer_with_permits(batch).run(sender=relayer, chain_id=CHAIN_ID)
+        sc.verify(c.data.ledger[0] == bob.address)
+        sc.verify(c.data.ledger[1] == cat.address)
+        sc.verify(c.data.permit_counters[alice.address] == 1)
+
+        sc.h3("Replays are rejected")
+        c.transfer_with_permits(batch).run(
+            sender=relayer, chain_id=CHAIN_ID, valid=False,
+            exception="FA2_INVALID_SIGNATURE")
+
+        sc.h3("The signer must own the tokens")
+        stolen_txs = transfers(bob, cat, 0)
+        c.transfer_with_permits([
+            sp.record(
+                public_key=cat.public_key,
+                signature=sp.some(_permit_signature(cat, c, 0, stolen_txs)),
+                transfers=stolen_txs,
+            )
+        ]).run(sender=relayer, chain_id=CHAIN_ID, valid=False,
+               exception="FA2_NOT_OWNER")
+
+        sc.h3("Registered permits")
+        cat_txs = transfers(cat, alice, 2)
+        c.permit([
+            sp.record(
+                public_key=cat.public_key,
+                signature=_permit_signature(cat, c, 0, cat_txs),
+                transfers_hash=sp.blake2b(sp.pack(cat_txs)),
+            )
+        ]).run(sender=relayer, chain_id=CHAIN_ID)
+        cat_item = sp.record(
+            public_key=cat.public_key, signature=sp.none, transfers=cat_txs)
+        c.transfer_with_permits([cat_item]).run(
+            sender=relayer, chain_id=CHAIN_ID)
+        sc.verify(c.data.ledger[2] == alice.address)
+        c.transfer_with_permits([cat_item]).run(
+            sender=relayer, chain_id=CHAIN_ID, valid=False,
+            exception="FA2_MISSING_PERMIT")
+
+    @sp.add_test(name="Benchmark events")
+    def test():
+        sc = sp.test_scenario()
+        for _Fa2 in [NftTest, NftEventsTest]:
+            sc.h2(_Fa2.__name__)
+            c = _nft_collection(_Fa2, 10, alice.address)
+            sc += c
+            for size in [1, 5]:
+                sc.h3("transfer %d tokens" % size)
+                c.transfer(
+                    _transfer_batch(alice.address, admin.address, range(size))
+                ).run(sender=alice)
+                sc.h3("mint %d tokens" % size)
+                c.mint([sp.record(to_=alice.address, metadata=tok0_md)] * size
+                       ).run(sender=admin)
+            sc.h3("update_operators")
+            operator = sp.record(owner=alice.address, operator=admin.address,
+                                 token_id=5)
+            c.update_operators([sp.variant("add_operator", operator)]).run(
+                sender=alice)
+            c.update_operators([sp.variant("remove_operator", operator)]).run(
+                sender=alice)
+            sc.h3("burn")
+            c.burn([sp.record(from_=alice.address, token_id=6, amount=1)]
+                   ).run(sender=alice)
+            sc.verify(~c.data.ledger.contains(6))
+
+    @sp.add_test(name="Benchmark hot-field-first storage layout")
+    def test():
+        sc = sp.test_scenario()
+        for _Fa2 in [NftTest, NftHotFieldsTest]:
+            sc.h2(_Fa2.__name__)
+            c = _nft_collection(_Fa2, 10, alice.address, PauseTransfer())
+            sc += c
+            sc.h3("transfer")
+            c.transfer(
+                _transfer_batch(alice.address, admin.address, range(5))
+            ).run(sender=alice)
+            sc.h3("update_operators")
+            c.update_operators(
+                [
+                    sp.variant(
+                        "add_operator",
+                        sp.record(owner=alice.address,
+                                  operator=admin.address, token_id=5),
+                    )
+                ]
+            ).run(sender=alice)
+            sc.h3("mint")
+            c.mint([sp.record(to_=alice.address, metadata=tok0_md)]
+                   ).run(sender=admin)
+            sc.h3("burn")
+            c.burn([sp.record(from_=alice.address, token_id=6, amount=1)]
+                   ).run(sender=alice)
+            sc.h3("set_administrator")
+            c.set_administrator(admin.address).run(sender=admin)
+
+    @sp.add_test(name="Zero balances are removed")
+    def test():
+        sc = sp.test_scenario()
+        fungible = _pre_minter(FungibleTest)
+        single_asset = _pre_minter(SingleAssetTest)
+        sc += fungible
+        sc += single_asset
+        for c in [fungible, single_asset]:
+            c.transfer(
+                [
+                    sp.record(
+                        from_=alice.address,
+                        txs=[sp.record(to_=admin.address,
+                                       token_id=0, amount=42)],
+                    )
+                ]
+            ).run(sender=alice)
+            c.burn(
+                [sp.record(from_=admin.address, token_id=0, amount=42)]
+            ).run(sender=admin)
+        sc.verify(~fungible.data.ledger.contains((alice.address, 0)))
+        sc.verify(~fungible.data.ledger.contains((admin.address, 0)))
+        sc.verify(~fungible.data.supply.contains(0))
+        sc.verify(fungible.data.supply[1] == 42)
+        sc.verify(~single_asset.data.ledger.contains(alice.address))
+        sc.verify(~single_asset.data.ledger.contains(admin.address))
+        sc.verify(single_asset.data.supply == 0)
+
+    @sp.add_test(name="Burn bitmap")
+    def test():
+        sc = sp.test_scenario()
+        c = NftTest(
+            metadata=METADATA,
+            token_metadata=[tok0_md] * 300,
+            ledger={token_id: alice.address for token_id in range(300)},
+        )
+        sc += c
+        burnt = [1, 255, 256, 299]
+        c.burn(
+            [sp.record(from_=alice.address, token_id=token_id, amount=1)
+             for token_id in burnt]
+        ).run(sender=alice)
+        sc.verify(c.data.burned_count == len(burnt))
+        sc.verify(c.data.burned[0] == (1 << 1) | (1 << 255))
+        sc.verify(c.data.burned[1] == (1 << 0) | (1 << 43))
+        # Burning twice fails before touching the bitmap.
+        c.burn(
+            [sp.record(from_=alice.address, token_id=1, amount=1)]
+        ).run(sender=alice, valid=False, exception="FA2_TOKEN_UNDEFINED")
+
+    @sp.add_test(name="Operators for all")
+    def test():
+        sc = sp.test_scenario()
+        c = _pre_minter(Fa2Nft, policy=OwnerOrOperatorForAllTransfer())
+        sc += c
+        approval = sp.record(owner=alice.address, operator=admin.address)
+        c.update_operators_for_all(
+            [sp.variant("add_operator", approval)]
+        ).run(sender=admin, valid=False, exception="FA2_NOT_OWNER")
+        c.update_operators_for_all(
+            [sp.variant("add_operator", approval)]).run(sender=alice)
+        c.transfer(
+            _transfer_batch(alice.address, admin.address, [0, 2])
+        ).run(sender=admin)
+        sc.verify(c.data.ledger[2] == admin.address)
+        c.update_operators_for_all(
+            [sp.variant("remove_operator", approval)]).run(sender=alice)
+        c.transfer(
+            _transfer_batch(alice.address, admin.address, [1])
+        ).run(sender=admin, valid=False, exception="FA2_NOT_OPERATOR")
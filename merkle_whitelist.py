@@ -0,0 +1,158 @@
+"""
+Build the Merkle tree used by `MerklePublicMintNft` (result.py).
+
+    python3 merkle_whitelist.py whitelist.csv [--json proofs.json]
+                                              [--scenario scenario.py]
+
+The first column of the CSV holds the addresses, a header line is skipped.
+
+Leaves are `blake2b(pack(address))` sorted, nodes are
+`blake2b(min(a, b) ++ max(a, b))` and a node without sibling goes up
+unchanged. A proof is the list of siblings from the leaf to the root, which
+is what `MerklePublicMintNft.mint` folds over.
+"""
+
+import argparse
+import csv
+import json
+
+from tezos_encoding import blake2b, pack_address
+
+
+def leaf(address):
+    return blake2b(pack_address(address))
+
+
+def node(a, b):
+    return blake2b(min(a, b) + max(a, b))
+
+
+def build(addresses):
+    """Return `(root, proofs)` for a list of addresses.
+
+    `proofs` maps each address to the list of its sibling hashes.
+    """
+    addresses = sorted(set(addresses), key=leaf)
+    if not addresses:
+        return bytes(32), {}
+    level = [leaf(address) for address in addresses]
+    positions = {address: index for index, address in enumerate(addresses)}
+    proofs = {address: [] for address in addresses}
+    while len(level) > 1:
+        for address, index in positions.items():
+            sibling = index ^ 1
+            if sibling < len(level):
+                proofs[address].append(level[sibling])
+            positions[address] = index // 2
+        level = [
+            node(level[i], level[i + 1]) if i + 1 < len(level) else level[i]
+            for i in range(0, len(level), 2)
+        ]
+    return level[0], proofs
+
+
+def verify(root, address, proof):
+    """Python equivalent of the on-chain proof check."""
+    current = leaf(address)
+    for sibling in proof:
+        current = node(current, sibling)
+    return current == root
+
+
+def read_csv(path):
+    with open(path, newline="") as f:
+        rows = [row[0].strip() for row in csv.reader(f) if row and row[0].strip()]
+    if rows and not rows[0].startswith(("tz", "KT1")):
+        rows = rows[1:]
+    return rows
+
+
+SCENARIO = '''import smartpy as sp
+
+Result = sp.io.import_script_from_url("file:result.py")
+
+ADMIN = sp.address("{admin}")
+OUTSIDER = sp.address("{outsider}")
+ROOT = sp.bytes("0x{root}")
+PROOFS = {{
+{proofs}
+}}
+
+
+@sp.add_test(name="Merkle whitelist equivalence")
+def test():
+    sc = sp.test_scenario()
+    by_set = Result.NftWithAdmin(
+        admin=ADMIN, metadata=Result.METADATA, token_metadata=[])
+    by_root = Result.NftWithAdminMerkle(
+        admin=ADMIN, whitelist_root=ROOT, metadata=Result.METADATA,
+        token_metadata=[])
+    sc += by_set
+    sc += by_root
+    for address in PROOFS:
+        by_set.toggleWhitelist(sp.address(address)).run(sender=ADMIN)
+
+    for address, proof in PROOFS.items():
+        sender = sp.address(address)
+        batch = [sp.record(to_=sender)]
+        by_set.mint(batch).run(sender=sender, amount=sp.tez(16))
+        by_root.mint(sp.record(batch=batch, proof=[sp.bytes(p) for p in proof])).run(
+            sender=sender, amount=sp.tez(16))
+
+    message = "INSUFFICIENT AMOUNT OF TEZOS - NOT WHITELISTED"
+    batch = [sp.record(to_=OUTSIDER)]
+    by_set.mint(batch).run(
+        sender=OUTSIDER, amount=sp.tez(16), valid=False, exception=message)
+    by_root.mint(sp.record(batch=batch, proof=[])).run(
+        sender=OUTSIDER, amount=sp.tez(16), valid=False, exception=message)
+'''
+
+
+def scenario(root, proofs, admin, outsider):
+    """Return a SmartPy test checking that every whitelisted address gets
+    the same treatment from `NftWithAdmin` and `NftWithAdminMerkle`."""
+    return SCENARIO.format(
+        admin=admin,
+        outsider=outsider,
+        root=root.hex(),
+        proofs="\n".join(
+            '    "%s": [%s],' % (address, ", ".join('"0x%s"' % p.hex() for p in proof))
+            for address, proof in sorted(proofs.items())
+        ),
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("csv", help="CSV file with one address per line")
+    parser.add_argument("--json", help="write the root and the proofs to this file")
+    parser.add_argument("--scenario", help="write an equivalence scenario to this file")
+    parser.add_argument("--admin", default="tz1XSBR9VJ1ggCEy9QHkEUXXsgZhwmzxm7fh")
+    parser.add_argument("--outsider", default="tz1burnburnburnburnburnburnburjAYjjX",
+                        help="address absent from the whitelist")
+    args = parser.parse_args()
+
+    addresses = read_csv(args.csv)
+    root, proofs = build(addresses)
+    if args.outsider in proofs:
+        parser.error("--outsider is whitelisted")
+    for address, proof in proofs.items():
+        assert verify(root, address, proof), address
+    print("0x" + root.hex())
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(
+                {
+                    "root": "0x" + root.hex(),
+                    "proofs": {a: ["0x" + p.hex() for p in proof] for a, proof in proofs.items()},
+                },
+                f,
+                indent=2,
+            )
+    if args.scenario:
+        with open(args.scenario, "w") as f:
+            f.write(scenario(root, proofs, args.admin, args.outsider))
+
+
+if __name__ == "__main__":
+    main()
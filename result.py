@@ -1,8 +1,20 @@
 from email import utils
 import smartpy as sp
-FA2 = sp.io.import_script_from_url("https://smartpy.io/templates/fa2_lib.py")
-Utils = sp.io.import_script_from_url(
-    "https://raw.githubusercontent.com/RomarQ/tezos-sc-utils/main/smartpy/utils.py")
+
+
+def import_template(url):
+    """Import the `file:` script at `url` under a name containing
+    "templates", so that its own tests are skipped as when importing the
+    upstream templates."""
+    path = url[len("file:"):]
+    with open(path) as f:
+        return sp.io.import_script_from_script("templates/" + path, f.read())
+
+
+# fa2.py is this repository's fork of the SmartPy fa2_lib template and
+# Utils.py its copy of tezos-sc-utils, extended with `Bytes.of_nat_ascii`.
+FA2 = import_template("file:fa2.py")
+Utils = sp.io.import_script_from_url("file:Utils.py")
 
 
 def string_of_nat(params):
@@ -17,84 +29,435 @@ def string_of_nat(params):
     return sp.concat(res.value)
 
 
-class PublicMintNft(sp.Contract):
+BASE_URI = "ipfs://QmWoCRq4iXnUwzMF2JUUxSbXsTSiuitxvWiYQ27XXusfNu/"
+
+
+def token_uri(base_uri, token_id):
+    """`base_uri ++ token_id ++ ".json"` as bytes, `base_uri` being bytes."""
+    return sp.concat([
+        base_uri,
+        Utils.Bytes.of_nat_ascii(token_id),
+        sp.utils.bytes_of_string(".json"),
+    ])
+
+
+t_whitelist_entry = sp.TRecord(
+    index=sp.TNat, quota=sp.TOption(sp.TNat)
+).layout(("index", "quota"))
+
+t_page_params = sp.TRecord(offset=sp.TNat, limit=sp.TNat).layout(
+    ("offset", "limit")
+)
+
+t_whitelist_update = sp.TVariant(
+    add_address=sp.TRecord(
+        address=sp.TAddress, quota=sp.TOption(sp.TNat)
+    ).layout(("address", "quota")),
+    remove_address=sp.TAddress,
+).layout(("add_address", "remove_address"))
+
+
+t_public_mint_batch = sp.TList(
+    sp.TRecord(
+        to_=sp.TAddress,
+    ).layout(("to_"))
+)
+
+
+class PublicMint(sp.Contract):
+    """(Mixin) Paid mint with incrementing id shared by `PublicMintNft` and
+    `MerklePublicMintNft`, which decide who gets the whitelist price."""
+
+    def mint_(self, batch, whitelisted):
+        """Check the price then mint one token per action."""
+        with sp.if_(whitelisted):
+            sp.verify(sp.amount > sp.tez(15),
+                      "INSUFFICIENT AMOUNT OF TEZOS - WHITELISTED")
+        with sp.else_():
+            sp.verify(sp.amount > sp.tez(20),
+                      "INSUFFICIENT AMOUNT OF TEZOS - NOT WHITELISTED")
+
+        token_id = sp.local("token_id", self.data.last_token_id)
+        with sp.for_("action", batch) as action:
+            self.set_token_metadata_(token_id.value)
+            self.data.ledger[token_id.value] = action.to_
+            self.transfer_event_("mint", None, action.to_, token_id.value, 1)
+            token_id.value += 1
+        self.data.last_token_id = token_id.value
+
+    def set_token_metadata_(self, token_id):
+        """Store the metadata of a freshly minted token."""
+        self.data.token_metadata[token_id] = sp.record(
+            token_id=token_id,
+            token_info=sp.map(
+                l={"": token_uri(sp.utils.bytes_of_string(BASE_URI), token_id)}
+            ),
+        )
+
+
+class PublicMintNft(PublicMint):
     """(Mixin) Non-standard `mint` entrypoint for FA2Nft with incrementing id.
 
+    The whitelist is a big_map so that its size doesn't change the cost of
+    the entrypoints. Each entry has an optional quota: the number of tokens
+    the address can still mint at the whitelist price (`None` means no
+    limit). `whitelist_index` numbers the addresses from 0 to
+    `whitelist_size - 1` for the `whitelist_page` view.
+
     Requires the `Admin` mixin.
     """
 
     def __init__(self, whitelist=[]):
         self.update_initial_storage(
-            whitelist=sp.set(
-                whitelist
+            whitelist=sp.big_map(
+                {
+                    address: sp.record(index=index, quota=sp.none)
+                    for index, address in enumerate(whitelist)
+                },
+                tkey=sp.TAddress,
+                tvalue=t_whitelist_entry,
+            ),
+            whitelist_index=sp.big_map(
+                dict(enumerate(whitelist)), tkey=sp.TNat, tvalue=sp.TAddress
             ),
-            string_of_nat=''
+            whitelist_size=sp.nat(len(whitelist)),
         )
 
-    @sp.entry_point
-    def toggleWhitelist(self, params):
+    def whitelist_add_(self, address, quota):
+        """Add `address` to the whitelist with `quota`.
+
+        An address already whitelisted keeps its remaining quota, see
+        `set_whitelist_quota` to change it.
+        """
+        with sp.if_(~self.data.whitelist.contains(address)):
+            self.data.whitelist[address] = sp.record(
+                index=self.data.whitelist_size, quota=quota)
+            self.data.whitelist_index[self.data.whitelist_size] = address
+            self.data.whitelist_size += 1
+
+    def whitelist_remove_(self, address):
+        """Remove `address` from the whitelist if present.
+
+        The last indexed address takes the index of the removed one.
+        """
+        with sp.if_(self.data.whitelist.contains(address)):
+            index = sp.compute(self.data.whitelist[address].index)
+            last_index = sp.compute(sp.as_nat(self.data.whitelist_size - 1))
+            last = sp.compute(self.data.whitelist_index[last_index])
+            self.data.whitelist_index[index] = last
+            self.data.whitelist[last].index = index
+            del self.data.whitelist_index[last_index]
+            del self.data.whitelist[address]
+            self.data.whitelist_size = last_index
+
+    def update_whitelist_(self, batch):
+        """Body of `update_whitelist`, shared with `LazyWhitelistAdmin`."""
+        sp.set_type(batch, sp.TList(t_whitelist_update))
+        sp.verify(self.is_administrator(sp.sender), "FA2_NOT_ADMIN")
+        with sp.for_("action", batch) as action:
+            with action.match_cases() as arg:
+                with arg.match("add_address") as add:
+                    self.whitelist_add_(add.address, add.quota)
+                with arg.match("remove_address") as address:
+                    self.whitelist_remove_(address)
+
+    def use_whitelist_(self, address, amount):
+        """Return whether `address` gets the whitelist price for `amount`
+        tokens and consume its quota if it does."""
+        entry = sp.compute(self.data.whitelist.get_opt(address))
+        whitelisted = sp.local("whitelisted", entry.is_some())
+        with sp.if_(whitelisted.value):
+            quota = sp.compute(entry.open_some().quota)
+            with sp.if_(quota.is_some()):
+                with sp.if_(quota.open_some() >= amount):
+                    self.data.whitelist[address].quota = sp.some(
+                        sp.as_nat(quota.open_some() - amount))
+                with sp.else_():
+                    whitelisted.value = False
+        return whitelisted.value
+
+    def toggle_whitelist_(self, params):
+        """Body of `toggleWhitelist`, shared with `LazyWhitelistAdmin`."""
+        sp.set_type(params, sp.TAddress)
         sp.verify(self.is_administrator(sp.sender), "FA2_NOT_ADMIN")
         with sp.if_(self.data.whitelist.contains(params)):
-            self.data.whitelist.remove(params)
+            self.whitelist_remove_(params)
         with sp.else_():
-            self.data.whitelist.add(params)
+            self.whitelist_add_(params, sp.none)
 
-    @sp.offchain_view()
-    def whitelist(self):
-        sp.result(self.data.whitelist)
+    def set_whitelist_quota_(self, params):
+        """Body of `set_whitelist_quota`, shared with `LazyWhitelistAdmin`."""
+        sp.set_type(
+            params,
+            sp.TRecord(address=sp.TAddress, quota=sp.TOption(sp.TNat)).layout(
+                ("address", "quota")
+            ),
+        )
+        sp.verify(self.is_administrator(sp.sender), "FA2_NOT_ADMIN")
+        sp.verify(self.data.whitelist.contains(params.address),
+                  "NOT WHITELISTED")
+        self.data.whitelist[params.address].quota = params.quota
 
-    # check sp.amount
-    # sef.data.whitelist
+    @sp.entry_point
+    def toggleWhitelist(self, params):
+        self.toggle_whitelist_(params)
 
     @sp.entry_point
-    def test_string_of_nat(self, params):
-        self.data.string_of_nat = string_of_nat(params)
+    def update_whitelist(self, batch):
+        """(Admin only) Add and remove addresses.
+
+        Unlike `toggleWhitelist` each action states the expected result so
+        replaying a batch is harmless: adding an address already whitelisted
+        leaves its remaining quota unchanged.
+        """
+        self.update_whitelist_(batch)
 
     @sp.entry_point
+    def set_whitelist_quota(self, params):
+        """(Admin only) Set the quota of a whitelisted address."""
+        self.set_whitelist_quota_(params)
+
+    @sp.offchain_view(pure=True)
+    def is_whitelisted(self, address):
+        """Return whether `address` is in the whitelist."""
+        sp.set_type(address, sp.TAddress)
+        sp.result(self.data.whitelist.contains(address))
+
+    @sp.offchain_view(pure=True)
+    def whitelist_page(self, params):
+        """Return the whitelisted addresses with an index in
+        `[offset, offset + limit)`."""
+        sp.set_type(params, t_page_params)
+        page = sp.local("page", sp.list(t=sp.TAddress))
+        end = sp.compute(
+            sp.min(params.offset + params.limit, self.data.whitelist_size))
+        with sp.for_("index", sp.range(params.offset, end)) as index:
+            page.value.push(self.data.whitelist_index[index])
+        sp.result(page.value.rev())
+
+    # check sp.amount
+    # sef.data.whitelist
+
+    @Utils.entry_point
     def mint(self, batch):
-        """Admin can mint new or existing tokens."""
+        """Anyone can mint new tokens, whitelisted addresses pay less."""
+        sp.set_type(batch, t_public_mint_batch)
+        # sp.verify(self.is_administrator(sp.sender), "FA2_NOT_ADMIN")
+        self.mint_(batch, self.use_whitelist_(sp.sender, sp.len(batch)))
+
+
+class MerklePublicMintNft(PublicMint):
+    """(Mixin) `PublicMintNft` with a whitelist reduced to a Merkle root.
+
+    `mint` takes the proof that `blake2b(pack(sp.sender))` is a leaf of the
+    tree: the sibling hashes from the leaf to the root, nodes being
+    `blake2b(min(a, b) ++ max(a, b))`. `merkle_whitelist.py` builds the
+    root and the proofs from a CSV. An empty proof pays the public price.
+
+    Requires the `Admin` mixin.
+    """
+
+    def __init__(self, whitelist_root=sp.bytes("0x" + "00" * 32)):
+        self.update_initial_storage(
+            whitelist_root=sp.set_type_expr(whitelist_root, sp.TBytes))
+
+    def is_whitelisted_(self, address, proof):
+        node = sp.local("node", sp.blake2b(sp.pack(address)))
+        with sp.for_("sibling", proof) as sibling:
+            with sp.if_(node.value < sibling):
+                node.value = sp.blake2b(node.value + sibling)
+            with sp.else_():
+                node.value = sp.blake2b(sibling + node.value)
+        return node.value == self.data.whitelist_root
+
+    def set_whitelist_root_(self, params):
+        """Body of `set_whitelist_root`, shared with
+        `LazyMerkleWhitelistAdmin`."""
+        sp.set_type(params, sp.TBytes)
+        sp.verify(self.is_administrator(sp.sender), "FA2_NOT_ADMIN")
+        self.data.whitelist_root = params
+
+    @sp.entry_point
+    def set_whitelist_root(self, params):
+        """(Admin only) Replace the whole whitelist."""
+        self.set_whitelist_root_(params)
+
+    @Utils.entry_point
+    def mint(self, params):
+        """Anyone can mint new tokens, whitelisted addresses pay less."""
         sp.set_type(
-            batch,
-            sp.TList(
-                sp.TRecord(
-                    to_=sp.TAddress,
-                ).layout(("to_"))
-            ),
+            params,
+            sp.TRecord(
+                batch=t_public_mint_batch, proof=sp.TList(sp.TBytes)
+            ).layout(("batch", "proof")),
         )
-        # sp.verify(self.is_administrator(sp.sender), "FA2_NOT_ADMIN")
+        self.mint_(params.batch, self.is_whitelisted_(
+            sp.sender, params.proof))
 
-        with sp.if_(self.data.whitelist.contains(sp.sender)):
-            sp.verify(sp.amount > sp.tez(15),
-                      "INSUFFICIENT AMOUNT OF TEZOS - WHITELISTED")
-        with sp.else_():
-            sp.verify(sp.amount > sp.tez(20),
-                      "INSUFFICIENT AMOUNT OF TEZOS - NOT WHITELISTED")
 
-        with sp.for_("action", batch) as action:
-            token_id = sp.compute(self.data.last_token_id)
-            metadata = sp.record(token_id=token_id, token_info=sp.map(
-                l={
-                    '':  Utils.Bytes.of_string(sp.concat([
-                        "ipfs://QmWoCRq4iXnUwzMF2JUUxSbXsTSiuitxvWiYQ27XXusfNu/",
-                        string_of_nat(token_id), ".json"])),
-                    # sp.utils.bytes_of_string(
-                    #     sp.concat([
-                    #         "ipfs://QmWoCRq4iXnUwzMF2JUUxSbXsTSiuitxvWiYQ27XXusfNu/",
-                    #         res, ".json"])
-                    # ),
-                }))
-            self.data.token_metadata[token_id] = metadata
-            self.data.ledger[token_id] = action.to_
-            self.data.last_token_id += 1
+class BaseUriTokenMetadata:
+    """(Mixin) Derive the metadata of minted tokens from a base URI.
+
+    `PublicMint` mints only write the `ledger` entry: the TZIP-21 URI
+    of a token is `base_uri ++ token_id ++ ".json"` and is built by the
+    `token_metadata` offchain view. Tokens present in the `token_metadata`
+    big_map (initial mint) keep their stored metadata.
+
+    Must be placed before the `PublicMint` mixin and the base class.
+    """
+
+    def __init__(self, base_uri=BASE_URI):
+        self.update_initial_storage(
+            base_uri=sp.utils.bytes_of_string(base_uri))
+
+    def is_defined(self, token_id):
+        # Ids are given sequentially by the initial mint and `PublicMint`.
+        return token_id < self.data.last_token_id
+
+    def set_token_metadata_(self, token_id):
+        pass
+
+    @Utils.offchain_view()
+    def token_metadata(self, token_id):
+        """Returns the token-metadata URI for the given token."""
+        sp.set_type(token_id, sp.TNat)
+        sp.verify(self.is_defined(token_id), "FA2_TOKEN_UNDEFINED")
+        sp.result(
+            self.data.token_metadata.get(
+                token_id,
+                default_value=sp.record(
+                    token_id=token_id,
+                    token_info=sp.map(
+                        l={"": token_uri(self.data.base_uri, token_id)}),
+                ),
+            )
+        )
+
+
+class StringOfNatDebug:
+    """(Mixin) Debug `test_string_of_nat` entrypoint and its storage field.
+
+    Only meant for the debug build, see `NftWithAdminDebug`.
+    """
+
+    def __init__(self):
+        self.update_initial_storage(string_of_nat='')
+
+    @sp.entry_point
+    def test_string_of_nat(self, params):
+        self.data.string_of_nat = string_of_nat(params)
+
+
+class LazyAdmin:
+    """(Mixin) Lazy versions of the `FA2.Admin` and `FA2.WithdrawMutez`
+    entrypoints.
+
+    The code of lazy entrypoints is kept in a big_map and only loaded when
+    they are called, so `transfer` and `mint` don't pay for deserializing
+    it. Must come before `FA2.Admin` and `FA2.WithdrawMutez` in the bases.
+    """
+
+    @sp.entry_point(lazify=True)
+    def set_administrator(self, params):
+        """(Admin only) Set the contract administrator."""
+        self.set_administrator_(params)
+
+    @sp.entry_point(lazify=True)
+    def withdraw_mutez(self, destination, amount):
+        """(Admin only) Transfer `amount` mutez to `destination`."""
+        self.withdraw_mutez_(destination, amount)
+
+
+class LazyWhitelistAdmin:
+    """(Mixin) Lazy versions of the admin entrypoints of `PublicMintNft`.
+
+    Must come before `PublicMintNft` in the bases.
+    """
+
+    @sp.entry_point(lazify=True)
+    def toggleWhitelist(self, params):
+        self.toggle_whitelist_(params)
+
+    @sp.entry_point(lazify=True)
+    def update_whitelist(self, batch):
+        """(Admin only) Add (or set the quota of) and remove addresses."""
+        self.update_whitelist_(batch)
+
+    @sp.entry_point(lazify=True)
+    def set_whitelist_quota(self, params):
+        """(Admin only) Set the quota of a whitelisted address."""
+        self.set_whitelist_quota_(params)
+
+
+class LazyMerkleWhitelistAdmin:
+    """(Mixin) Lazy version of the admin entrypoint of
+    `MerklePublicMintNft`.
+
+    Must come before `MerklePublicMintNft` in the bases.
+    """
+
+    @sp.entry_point(lazify=True)
+    def set_whitelist_root(self, params):
+        """(Admin only) Replace the whole whitelist."""
+        self.set_whitelist_root_(params)
 
 
 class NftWithAdmin(FA2.Admin, FA2.WithdrawMutez, PublicMintNft, FA2.Fa2Nft):
+    storage_access_frequency = {
+        "ledger": 4,
+        "operators": 3,
+        "last_token_id": 2,
+        "whitelist": 2,
+        "token_metadata": 1,
+    }
+
     def __init__(self, admin, **kwargs):
         FA2.Fa2Nft.__init__(self, **kwargs)
         FA2.Admin.__init__(self, admin)
         PublicMintNft.__init__(self)
 
 
+class NftWithAdminDebug(StringOfNatDebug, NftWithAdmin):
+    """Debug build: `NftWithAdmin` with the `test_string_of_nat` entrypoint."""
+
+    def __init__(self, admin, **kwargs):
+        NftWithAdmin.__init__(self, admin, **kwargs)
+        StringOfNatDebug.__init__(self)
+
+
+class NftWithAdminProduction(LazyAdmin, LazyWhitelistAdmin, NftWithAdmin):
+    """Production build: `NftWithAdmin` with lazy admin entrypoints."""
+
+
+class NftWithAdminMerkle(FA2.Admin, FA2.WithdrawMutez, MerklePublicMintNft, FA2.Fa2Nft):
+    def __init__(self, admin, whitelist_root, **kwargs):
+        FA2.Fa2Nft.__init__(self, **kwargs)
+        FA2.Admin.__init__(self, admin)
+        MerklePublicMintNft.__init__(self, whitelist_root)
+
+
+class NftWithAdminMerkleProduction(
+    LazyAdmin, LazyMerkleWhitelistAdmin, NftWithAdminMerkle
+):
+    """Production build: `NftWithAdminMerkle` with lazy admin entrypoints."""
+
+
+class NftWithAdminBaseUri(
+    FA2.Admin, FA2.WithdrawMutez, BaseUriTokenMetadata, PublicMintNft, FA2.Fa2Nft
+):
+    def __init__(self, admin, base_uri=BASE_URI, **kwargs):
+        FA2.Fa2Nft.__init__(self, **kwargs)
+        FA2.Admin.__init__(self, admin)
+        PublicMintNft.__init__(self)
+        BaseUriTokenMetadata.__init__(self, base_uri)
+
+
+class NftWithAdminBaseUriProduction(
+    LazyAdmin, LazyWhitelistAdmin, NftWithAdminBaseUri
+):
+    """Production build: `NftWithAdminBaseUri` with lazy admin entrypoints."""
+
+
 tok0_md = sp.map(l={
     "": sp.utils.bytes_of_string(
         "ipfs://QmTq1FXht8jFc9CaW2j2hJ3bMjLqgAJhr3bxjcJ723TaHT"
@@ -107,6 +470,44 @@ METADATA = sp.utils.metadata_of_url(
     "ipfs://bafkreiels7nywfxi6tcmj7j6cbmtqh7uoeneun6hqc4i5ngd3w74p2thn4")
 
 
+class NatToBytesBench(sp.Contract):
+    """Helper comparing `string_of_nat` + `Bytes.of_string` with
+    `Bytes.of_nat_ascii`. Not meant to be deployed."""
+
+    def __init__(self):
+        self.init(result=sp.bytes("0x"))
+
+    @Utils.entry_point
+    def legacy(self, params):
+        self.data.result = Utils.Bytes.of_string(string_of_nat(params))
+
+    @Utils.entry_point
+    def native(self, params):
+        self.data.result = Utils.Bytes.of_nat_ascii(params)
+
+
+class GeneratedVarsTest(sp.Contract):
+    """Helper calling the same Utils function twice in one entrypoint. Not
+    meant to be deployed."""
+
+    def __init__(self):
+        self.init(result=sp.int(0))
+
+    @Utils.entry_point
+    def add(self, params):
+        sp.set_type(params, sp.TRecord(a=sp.TString, b=sp.TString))
+        self.data.result = (
+            Utils.Int.of_string(params.a) + Utils.Int.of_string(params.b)
+        )
+
+    @Utils.entry_point
+    def add_nested(self, params):
+        sp.set_type(params, sp.TRecord(a=sp.TString, b=sp.TString))
+        # A nested scope continues the numbering of the entrypoint's one.
+        of_string = Utils.scoped(Utils.Int.of_string)
+        self.data.result = of_string(params.a) + of_string(params.b)
+
+
 alice = sp.test_account("Alice")
 bob = sp.test_account("bob")
 cat = sp.test_account("cat")
@@ -116,7 +517,7 @@ cat = sp.test_account("cat")
 def test():
     sc = sp.test_scenario()
 
-    c1 = NftWithAdmin(
+    c1 = NftWithAdminDebug(
         admin=sp.address("tz1XSBR9VJ1ggCEy9QHkEUXXsgZhwmzxm7fh"),
         metadata=METADATA,
         token_metadata=[],
@@ -135,8 +536,273 @@ def test():
     # sc.show(c1.testString())
 
 
+@sp.add_test(name="NFT with admin and base URI mint")
+def test():
+    sc = sp.test_scenario()
+
+    c1 = NftWithAdminBaseUri(
+        admin=sp.address("tz1XSBR9VJ1ggCEy9QHkEUXXsgZhwmzxm7fh"),
+        metadata=METADATA,
+        token_metadata=[],
+    )
+    sc += c1
+
+    c1.mint([sp.record(to_=alice.address), sp.record(to_=bob.address)]).run(
+        sender=alice, amount=sp.tez(21))
+    sc.verify(c1.data.ledger[0] == alice.address)
+    sc.verify(c1.data.ledger[1] == bob.address)
+    sc.verify(~c1.data.token_metadata.contains(0))
+    c1.transfer([
+        sp.record(from_=alice.address, txs=[
+                  sp.record(to_=cat.address, token_id=0, amount=1)])
+    ]).run(sender=alice)
+    sc.verify(c1.data.ledger[0] == cat.address)
+
+
+@sp.add_test(name="Big_map whitelist")
+def test():
+    sc = sp.test_scenario()
+    admin = sp.address("tz1XSBR9VJ1ggCEy9QHkEUXXsgZhwmzxm7fh")
+
+    c1 = NftWithAdmin(admin=admin, metadata=METADATA, token_metadata=[])
+    sc += c1
+
+    c1.toggleWhitelist(alice.address).run(sender=bob, valid=False)
+    c1.toggleWhitelist(alice.address).run(sender=admin)
+    c1.toggleWhitelist(bob.address).run(sender=admin)
+    c1.toggleWhitelist(cat.address).run(sender=admin)
+    sc.verify(c1.data.whitelist_size == 3)
+
+    c1.mint([sp.record(to_=alice.address)]).run(
+        sender=alice, amount=sp.tez(16))
+
+    # Removing bob moves cat to bob's index.
+    c1.toggleWhitelist(bob.address).run(sender=admin)
+    sc.verify(c1.data.whitelist_size == 2)
+    sc.verify(c1.data.whitelist[cat.address].index == 1)
+    sc.verify(c1.data.whitelist_index[1] == cat.address)
+    sc.verify(~c1.data.whitelist_index.contains(2))
+    c1.mint([sp.record(to_=bob.address)]).run(
+        sender=bob, amount=sp.tez(16), valid=False,
+        exception="INSUFFICIENT AMOUNT OF TEZOS - NOT WHITELISTED")
+
+    # A quota of 2 covers a mint of 2 tokens, not a third one.
+    c1.set_whitelist_quota(
+        sp.record(address=cat.address, quota=sp.some(2))).run(sender=admin)
+    c1.mint([sp.record(to_=cat.address)] * 2).run(
+        sender=cat, amount=sp.tez(16))
+    sc.verify(c1.data.whitelist[cat.address].quota == sp.some(0))
+    c1.mint([sp.record(to_=cat.address)]).run(
+        sender=cat, amount=sp.tez(16), valid=False,
+        exception="INSUFFICIENT AMOUNT OF TEZOS - NOT WHITELISTED")
+
+
+@sp.add_test(name="Batched whitelist updates")
+def test():
+    sc = sp.test_scenario()
+    admin = sp.address("tz1XSBR9VJ1ggCEy9QHkEUXXsgZhwmzxm7fh")
+
+    batch = [
+        sp.variant("add_address", sp.record(address=alice.address,
+                                            quota=sp.none)),
+        sp.variant("add_address", sp.record(address=bob.address,
+                                            quota=sp.some(1))),
+        sp.variant("add_address", sp.record(address=cat.address,
+                                            quota=sp.none)),
+        sp.variant("remove_address", alice.address),
+    ]
+    # The lazy entrypoint shares its body with the eager one.
+    for _Nft in [NftWithAdmin, NftWithAdminProduction]:
+        sc.h2(_Nft.__name__)
+        c1 = _Nft(admin=admin, metadata=METADATA, token_metadata=[])
+        sc += c1
+
+        c1.update_whitelist(batch).run(sender=bob, valid=False,
+                                       exception="FA2_NOT_ADMIN")
+        c1.update_whitelist(batch).run(sender=admin)
+        sc.verify(c1.data.whitelist[bob.address].quota == sp.some(1))
+        c1.mint([sp.record(to_=bob.address)]).run(
+            sender=bob, amount=sp.tez(16))
+        # Replaying the same batch gives the same whitelist and doesn't
+        # restore the quota bob used.
+        c1.update_whitelist(batch).run(sender=admin)
+        sc.verify(c1.data.whitelist_size == 2)
+        sc.verify(~c1.data.whitelist.contains(alice.address))
+        sc.verify(c1.data.whitelist[bob.address].quota == sp.some(0))
+        sc.verify(
+            c1.data.whitelist_index[c1.data.whitelist[cat.address].index]
+            == cat.address)
+
+
+@sp.add_test(name="Benchmark batched whitelist updates")
+def test():
+    sc = sp.test_scenario()
+    admin = sp.address("tz1XSBR9VJ1ggCEy9QHkEUXXsgZhwmzxm7fh")
+
+    for size in [10, 100, 1000]:
+        addresses = [sp.test_account("Collector %d" % i).address
+                     for i in range(size)]
+
+        sc.h2("%d single calls" % size)
+        c1 = NftWithAdmin(admin=admin, metadata=METADATA, token_metadata=[])
+        sc += c1
+        for address in addresses:
+            c1.toggleWhitelist(address).run(sender=admin)
+
+        sc.h2("One batch of %d" % size)
+        c2 = NftWithAdmin(admin=admin, metadata=METADATA, token_metadata=[])
+        sc += c2
+        c2.update_whitelist([
+            sp.variant("add_address", sp.record(address=address,
+                                                quota=sp.none))
+            for address in addresses
+        ]).run(sender=admin)
+        sc.verify(c2.data.whitelist_size == size)
+
+
+@sp.add_test(name="Merkle whitelist")
+def test():
+    sc = sp.test_scenario()
+    admin = sp.address("tz1XSBR9VJ1ggCEy9QHkEUXXsgZhwmzxm7fh")
+    # Built with merkle_whitelist.py
+    whitelist = {
+        sp.address("tz1VSUr8wwNhLAzempoch5d6hLRiTh8Cjcjb"): [
+            sp.bytes("0x9101f52b1a9a368c6a3015176048e37b03571f38fd046183f24a2ac9db9407e4")],
+        sp.address("tz1aSkwEot3L2kmUvcoxzjMomb9mvBNuzFK6"): [
+            sp.bytes("0x2b86a28210e1a3ef8687f2c456f8bc8fd05eb130be359ed5e94d63f05d3e41b9")],
+    }
+    root = sp.bytes(
+        "0x7ab45a4c829482cda8dd92579bed1a29a8e424d3de575e598b500f21bbad9242")
+
+    by_set = NftWithAdmin(admin=admin, metadata=METADATA, token_metadata=[])
+    by_root = NftWithAdminMerkle(
+        admin=admin, whitelist_root=root, metadata=METADATA, token_metadata=[])
+    sc += by_set
+    sc += by_root
+    for address in whitelist:
+        by_set.toggleWhitelist(address).run(sender=admin)
+
+    # Same price for the same addresses.
+    for address, proof in whitelist.items():
+        batch = [sp.record(to_=address)]
+        by_set.mint(batch).run(sender=address, amount=sp.tez(16))
+        by_root.mint(sp.record(batch=batch, proof=proof)).run(
+            sender=address, amount=sp.tez(16))
+    message = "INSUFFICIENT AMOUNT OF TEZOS - NOT WHITELISTED"
+    batch = [sp.record(to_=admin)]
+    by_set.mint(batch).run(
+        sender=admin, amount=sp.tez(16), valid=False, exception=message)
+    by_root.mint(sp.record(batch=batch, proof=[])).run(
+        sender=admin, amount=sp.tez(16), valid=False, exception=message)
+    # A proof only works for its own address.
+    proof = list(whitelist.values())[0]
+    by_root.mint(sp.record(batch=batch, proof=proof)).run(
+        sender=admin, amount=sp.tez(16), valid=False, exception=message)
+
+    # Rotating the list is a single call.
+    by_root.set_whitelist_root(sp.bytes("0x" + "00" * 32)).run(sender=admin)
+    for address, proof in whitelist.items():
+        by_root.mint(sp.record(batch=[sp.record(to_=address)], proof=proof)).run(
+            sender=address, amount=sp.tez(16), valid=False, exception=message)
+
+
+@sp.add_test(name="Nat to ASCII bytes")
+def test():
+    sc = sp.test_scenario()
+
+    c1 = NatToBytesBench()
+    sc += c1
+
+    for n in [0, 7, 10, 99, 12345, 10 ** 6]:
+        sc.h3("%d" % n)
+        c1.legacy(n)
+        sc.verify(c1.data.result == sp.utils.bytes_of_string(str(n)))
+        c1.native(n)
+        sc.verify(c1.data.result == sp.utils.bytes_of_string(str(n)))
+
+
+@sp.add_test(name="Generated variable names")
+def test():
+    sc = sp.test_scenario()
+
+    c1 = GeneratedVarsTest()
+    sc += c1
+    c1.add(a="12", b="-345")
+    sc.verify(c1.data.result == -333)
+    c1.add(a="7", b="7")
+    sc.verify(c1.data.result == 14)
+    c1.add_nested(a="12", b="-345")
+    sc.verify(c1.data.result == -333)
+
+
+@sp.add_test(name="Production build profile")
+def test():
+    sc = sp.test_scenario()
+    admin = sp.address("tz1XSBR9VJ1ggCEy9QHkEUXXsgZhwmzxm7fh")
+
+    for _Nft in [NftWithAdminDebug, NftWithAdminProduction]:
+        sc.h2(_Nft.__name__)
+        c1 = _Nft(admin=admin, metadata=METADATA, token_metadata=[])
+        sc += c1
+
+        sc.h3("Hot path")
+        c1.mint([sp.record(to_=alice.address)] * 2).run(
+            sender=alice, amount=sp.tez(42))
+        c1.transfer([
+            sp.record(from_=alice.address, txs=[
+                      sp.record(to_=bob.address, token_id=0, amount=1)])
+        ]).run(sender=alice)
+        sc.verify(c1.data.ledger[0] == bob.address)
+
+        sc.h3("Admin entrypoints")
+        c1.toggleWhitelist(bob.address).run(sender=alice, valid=False)
+        c1.toggleWhitelist(bob.address).run(sender=admin)
+        sc.verify(c1.data.whitelist.contains(bob.address))
+        c1.update_whitelist([
+            sp.variant("add_address", sp.record(address=cat.address,
+                                                quota=sp.none))
+        ]).run(sender=alice, valid=False, exception="FA2_NOT_ADMIN")
+        c1.update_whitelist([
+            sp.variant("add_address", sp.record(address=cat.address,
+                                                quota=sp.none))
+        ]).run(sender=admin)
+        c1.set_whitelist_quota(
+            sp.record(address=cat.address, quota=sp.some(1))
+        ).run(sender=alice, valid=False, exception="FA2_NOT_ADMIN")
+        c1.set_whitelist_quota(
+            sp.record(address=cat.address, quota=sp.some(1))).run(sender=admin)
+        sc.verify(c1.data.whitelist[cat.address].quota == sp.some(1))
+        c1.withdraw_mutez(destination=admin, amount=sp.tez(1)).run(
+            sender=alice, valid=False, exception="FA2_NOT_ADMIN")
+        c1.withdraw_mutez(destination=admin, amount=sp.tez(1)).run(
+            sender=admin)
+        c1.set_administrator(alice.address).run(sender=admin)
+        sc.verify(c1.data.administrator == alice.address)
+
+    for _Nft in [NftWithAdminMerkle, NftWithAdminMerkleProduction]:
+        sc.h2(_Nft.__name__)
+        c1 = _Nft(admin=admin, whitelist_root=sp.bytes("0x" + "00" * 32),
+                  metadata=METADATA, token_metadata=[])
+        sc += c1
+        root = sp.bytes("0x" + "11" * 32)
+        c1.set_whitelist_root(root).run(
+            sender=alice, valid=False, exception="FA2_NOT_ADMIN")
+        c1.set_whitelist_root(root).run(sender=admin)
+        sc.verify(c1.data.whitelist_root == root)
+
+
 # A a compilation target (produces compiled code)
-sp.add_compilation_target("NftWithAdmin_Compiled", NftWithAdmin(
+sp.add_compilation_target("NftWithAdmin_Compiled", NftWithAdminProduction(
+    admin=sp.address("tz1XSBR9VJ1ggCEy9QHkEUXXsgZhwmzxm7fh"),
+    metadata=sp.utils.metadata_of_url(
+        "ipfs://bafkreigb6nsuvwc7vzx6oqzoaeaxno6liyr5rigbheg2ol7ndac75kawoe"
+    ),
+    token_metadata=[],
+))
+
+# Debug build with the test-only entrypoints, to compare sizes with the
+# production one.
+sp.add_compilation_target("NftWithAdmin_Debug_Compiled", NftWithAdminDebug(
     admin=sp.address("tz1XSBR9VJ1ggCEy9QHkEUXXsgZhwmzxm7fh"),
     metadata=sp.utils.metadata_of_url(
         "ipfs://bafkreigb6nsuvwc7vzx6oqzoaeaxno6liyr5rigbheg2ol7ndac75kawoe"
@@ -0,0 +1,145 @@
+"""
+Run the scenarios of fa2.py as parallel jobs of the SmartPy CLI.
+
+    python3 run_scenarios.py [PATTERN ...] [--jobs 8] [--output output/scenarios]
+    python3 run_scenarios.py --list
+
+Each scenario runs in its own `SmartPy.sh test` process and writes to its
+own directory under `--output`. The process runs a launcher script that
+imports the tested script with an `sp.add_test` registering only the
+selected scenario, so the tested script keeps plain `sp.add_test`
+scenarios. Patterns (`fnmatch` syntax, e.g. `"Benchmark*"`) restrict the
+scenarios to run. The pass/fail status and the duration of each job are
+printed and saved in `summary.json`.
+"""
+
+import argparse
+import concurrent.futures
+import fnmatch
+import json
+import os
+import re
+import subprocess
+import sys
+import tempfile
+import time
+
+SMARTPY = os.path.expanduser("~/smartpy-cli/SmartPy.sh")
+
+LAUNCHER = """\
+import smartpy as sp
+
+SCRIPT = %(script)r
+# Names of the scenarios to register, all of them are skipped if None.
+SELECTED = %(selected)r
+LISTING = %(listing)r
+
+add_test = sp.add_test
+names = []
+
+
+def selected_add_test(*args, **kwargs):
+    name = kwargs["name"] if "name" in kwargs else args[0]
+    names.append(name)
+    if SELECTED is not None and name in SELECTED:
+        return add_test(*args, **kwargs)
+    return lambda test: test
+
+
+sp.add_test = selected_add_test
+try:
+    with open(SCRIPT) as f:
+        sp.io.import_script_from_script("scenarios", f.read())
+finally:
+    sp.add_test = add_test
+if LISTING is not None:
+    with open(LISTING, "w") as f:
+        f.write("".join(name + "\\n" for name in names))
+"""
+
+
+def run_launcher(smartpy, script, output, log, selected=None, listing=None):
+    """Run `script` through a launcher registering only the `selected`
+    scenarios and writing the names of all of them to `listing`."""
+    launcher = os.path.join(output, "launcher.py")
+    with open(launcher, "w") as f:
+        f.write(LAUNCHER % {"script": os.path.abspath(script),
+                            "selected": selected, "listing": listing})
+    return subprocess.run(
+        [smartpy, "test", launcher, os.path.join(output, "output")],
+        stdout=log, stderr=subprocess.STDOUT,
+    )
+
+
+def list_scenarios(smartpy, script):
+    """Return the names of the scenarios of `script`."""
+    with tempfile.TemporaryDirectory() as tmp:
+        names = os.path.join(tmp, "scenarios.txt")
+        result = run_launcher(smartpy, script, tmp, subprocess.DEVNULL,
+                              listing=names)
+        result.check_returncode()
+        with open(names) as f:
+            return list(dict.fromkeys(f.read().splitlines()))
+
+
+def run_scenario(smartpy, script, name, output):
+    """Run one scenario, return `(name, passed, seconds)`."""
+    directory = os.path.join(output, re.sub(r"[^A-Za-z0-9_.-]+", "_", name))
+    os.makedirs(directory, exist_ok=True)
+    start = time.perf_counter()
+    with open(os.path.join(directory, "log.txt"), "w") as log:
+        result = run_launcher(smartpy, script, directory, log, selected=[name])
+    return name, result.returncode == 0, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("patterns", nargs="*", default=["*"])
+    parser.add_argument("--script", default="fa2.py")
+    parser.add_argument("--jobs", type=int, default=os.cpu_count())
+    parser.add_argument("--output", default=os.path.join("output", "scenarios"))
+    parser.add_argument("--smartpy", default=SMARTPY)
+    parser.add_argument("--list", action="store_true",
+                        help="print the scenario names and exit")
+    args = parser.parse_args()
+
+    names = [
+        name
+        for name in list_scenarios(args.smartpy, args.script)
+        if any(fnmatch.fnmatchcase(name, pattern) for pattern in args.patterns)
+    ]
+    if args.list:
+        print("\n".join(names))
+        return
+
+    start = time.perf_counter()
+    results = []
+    with concurrent.futures.ProcessPoolExecutor(args.jobs) as pool:
+        jobs = [
+            pool.submit(run_scenario, args.smartpy, args.script, name, args.output)
+            for name in names
+        ]
+        for job in concurrent.futures.as_completed(jobs):
+            name, passed, seconds = job.result()
+            results.append({"name": name, "passed": passed, "seconds": seconds})
+            print("%s %7.2fs %s" % ("ok  " if passed else "FAIL", seconds, name))
+    wall = time.perf_counter() - start
+
+    failed = [result["name"] for result in results if not result["passed"]]
+    total = sum(result["seconds"] for result in results)
+    print(
+        "%d passed, %d failed in %.2fs (%.2fs of jobs on %d workers)"
+        % (len(results) - len(failed), len(failed), wall, total, args.jobs)
+    )
+    os.makedirs(args.output, exist_ok=True)
+    with open(os.path.join(args.output, "summary.json"), "w") as f:
+        json.dump(
+            {"wall_seconds": wall, "jobs": args.jobs,
+             "results": sorted(results, key=lambda result: result["name"])},
+            f, indent=2,
+        )
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
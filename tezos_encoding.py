@@ -0,0 +1,64 @@
+"""
+Off-chain helpers reproducing the Michelson binary encoding of the values
+the contracts in this repository hash or unpack.
+
+Plain Python (no SmartPy needed) so they can run in build scripts.
+"""
+
+import hashlib
+
+BASE58_ALPHABET = "123456789ABCDEFGHJKLMNPQRSTUVWXYZabcdefghijkmnopqrstuvwxyz"
+
+# base58check prefix => binary tag of the address (22 bytes once encoded)
+ADDRESS_PREFIXES = {
+    "tz1": (bytes.fromhex("06a19f"), bytes.fromhex("0000")),
+    "tz2": (bytes.fromhex("06a1a1"), bytes.fromhex("0001")),
+    "tz3": (bytes.fromhex("06a1a4"), bytes.fromhex("0002")),
+    "tz4": (bytes.fromhex("06a1a6"), bytes.fromhex("0003")),
+    "KT1": (bytes.fromhex("025a79"), bytes.fromhex("01")),
+}
+
+
+def b58check_decode(text):
+    """Decode a base58check string and verify its checksum."""
+    number = 0
+    for char in text:
+        number = number * 58 + BASE58_ALPHABET.index(char)
+    raw = number.to_bytes((number.bit_length() + 7) // 8, "big")
+    raw = b"\x00" * (len(text) - len(text.lstrip("1"))) + raw
+    payload, checksum = raw[:-4], raw[-4:]
+    if hashlib.sha256(hashlib.sha256(payload).digest()).digest()[:4] != checksum:
+        raise ValueError("Invalid checksum for %r" % text)
+    return payload
+
+
+def address_bytes(address):
+    """Binary (22 bytes) encoding of an address, as found inside a PACK."""
+    try:
+        prefix, tag = ADDRESS_PREFIXES[address[:3]]
+    except KeyError:
+        raise ValueError("Unsupported address %r" % address)
+    payload = b58check_decode(address)
+    if not payload.startswith(prefix) or len(payload) != len(prefix) + 20:
+        raise ValueError("Invalid address %r" % address)
+    digest = payload[len(prefix):]
+    if address.startswith("KT1"):
+        return tag + digest + b"\x00"
+    return tag + digest
+
+
+def pack_address(address):
+    """Equivalent of `sp.pack(address)`."""
+    encoded = address_bytes(address)
+    return b"\x05\x0a" + len(encoded).to_bytes(4, "big") + encoded
+
+
+def blake2b(data):
+    """Equivalent of `sp.blake2b` (32 bytes digest)."""
+    return hashlib.blake2b(data, digest_size=32).digest()
+
+
+def pack_recipients(addresses):
+    """`recipients` parameter of the `airdrop` entrypoint: the 22 bytes
+    encoding of each address, concatenated."""
+    return b"".join(address_bytes(address) for address in addresses)